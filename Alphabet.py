@@ -0,0 +1,189 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+import sys
+
+# A character set is a sorted tuple of disjoint (first, last) code point intervals.
+type CharSet = tuple[tuple[int, int], ...]
+
+
+def char_set_of(chars: Iterable[str]) -> CharSet:
+    intervals = []
+    for code in sorted(set(map(ord, chars))):
+        # Extending the last interval when the code points are consecutive.
+        if intervals and intervals[-1][1] + 1 == code:
+            intervals[-1] = (intervals[-1][0], code)
+        else:
+            intervals.append((code, code))
+
+    return tuple(intervals)
+
+
+def char_set_union(*char_sets: Iterable[tuple[int, int]]) -> CharSet:
+    # The intervals may overlap or be given in any order.
+    intervals = []
+    for first, last in sorted(interval for char_set in char_sets for interval in char_set):
+        if intervals and first <= intervals[-1][1] + 1:
+            intervals[-1] = (intervals[-1][0], max(intervals[-1][1], last))
+        else:
+            intervals.append((first, last))
+
+    return tuple(intervals)
+
+
+def char_set_complement(char_set: CharSet) -> CharSet:
+    # The code points (up to sys.maxunicode) that are not in the set.
+    intervals = []
+    first = 0
+    for first_in_set, last_in_set in char_set:
+        if first < first_in_set:
+            intervals.append((first, first_in_set - 1))
+        first = last_in_set + 1
+    if first <= sys.maxunicode:
+        intervals.append((first, sys.maxunicode))
+
+    return tuple(intervals)
+
+
+def chars_of(char_set: CharSet) -> set[str]:
+    return {chr(code) for first, last in char_set for code in range(first, last + 1)}
+
+
+# Largest code point encoded with 1, 2 and 3 bytes in UTF-8.
+UTF8_LENGTH_LIMITS = (0x7F, 0x7FF, 0xFFFF)
+# Surrogates have no UTF-8 encoding.
+SURROGATES = (0xD800, 0xDFFF)
+
+
+def utf8_sequences(first: int, last: int) -> list[tuple[tuple[int, int], ...]]:
+    # Splits the code points [first, last] into sequences of byte ranges: the
+    # UTF-8 encodings of the code points are exactly the byte strings whose
+    # n-th byte is in the n-th range of one of the sequences.
+    sequences = []
+    ranges = [(first, last)]
+
+    while ranges:
+        first, last = ranges.pop()
+        if first > last:
+            continue
+        if first <= SURROGATES[1] and last >= SURROGATES[0]:
+            ranges += [(first, SURROGATES[0] - 1), (SURROGATES[1] + 1, last)]
+            continue
+
+        # Both ends have to be encoded with the same number of bytes.
+        limit = next((limit for limit in UTF8_LENGTH_LIMITS if first <= limit < last), None)
+        if limit is not None:
+            ranges += [(first, limit), (limit + 1, last)]
+            continue
+
+        # And the continuation bytes after any prefix have to cover a whole
+        # range (0x80 to 0xBF), except for the ones of the ends themselves.
+        for nr_continuation_bytes in range(1, 4):
+            mask = (1 << 6 * nr_continuation_bytes) - 1
+            if first & ~mask == last & ~mask:
+                continue
+            if first & mask:
+                ranges += [(first, first | mask), ((first | mask) + 1, last)]
+                break
+            if last & mask != mask:
+                ranges += [(first, (last & ~mask) - 1), (last & ~mask, last)]
+                break
+        else:
+            sequences.append(tuple(zip(chr(first).encode(), chr(last).encode())))
+
+    return sequences
+
+
+class Alphabet:
+    # Splits the characters into equivalence classes with respect to a group of
+    # character sets: two characters are in the same class when every set
+    # contains both of them or none of them. Every class is represented by one
+    # of its characters, automata built over the classes only use those.
+    def __init__(self, char_sets: Iterable[CharSet]) -> None:
+        char_sets = list(dict.fromkeys(char_sets))
+
+        # Segments are the ranges between two consecutive boundaries, every set
+        # either covers a whole segment or does not touch it.
+        boundaries = sorted({first for char_set in char_sets for first, _ in char_set} |
+                            {last + 1 for char_set in char_sets for _, last in char_set})
+        covered_by = [[] for _ in boundaries]
+        for set_index, char_set in enumerate(char_sets):
+            for first, last in char_set:
+                for segment in range(bisect_left(boundaries, first), bisect_left(boundaries, last + 1)):
+                    covered_by[segment].append(set_index)
+
+        # Segments covered by the same sets form a class. The characters that
+        # are in no set have no class at all.
+        symbol_of_sets = {}
+        self.boundaries = boundaries
+        self.segment_symbols = []
+        for first, sets in zip(boundaries, covered_by):
+            if sets:
+                self.segment_symbols.append(symbol_of_sets.setdefault(tuple(sets), chr(first)))
+            else:
+                self.segment_symbols.append(None)
+
+        self.S = set(symbol_of_sets.values())
+
+    @classmethod
+    def from_segments(cls, boundaries: list[int], segment_symbols: list[str | None]) -> 'Alphabet':
+        # Rebuilds an alphabet from the segments of one built before (e.g. loaded from a file).
+        alphabet = cls.__new__(cls)
+        alphabet.boundaries = boundaries
+        alphabet.segment_symbols = segment_symbols
+        alphabet.S = {symbol for symbol in segment_symbols if symbol is not None}
+        return alphabet
+
+    def symbol(self, char: str) -> str | None:
+        segment = bisect_right(self.boundaries, ord(char)) - 1
+        return self.segment_symbols[segment] if segment >= 0 else None
+
+    def symbols(self, char_set: CharSet) -> set[str]:
+        # The char set has to be one of the sets the alphabet was built from.
+        return {self.segment_symbols[segment]
+                for first, last in char_set
+                for segment in range(bisect_left(self.boundaries, first),
+                                     bisect_left(self.boundaries, last + 1))}
+
+    def sequences(self, char_set: CharSet) -> list[tuple[set[str], ...]]:
+        # The symbols the automata read for a character of the set, one set of
+        # symbols per step. Here a character is read as its own class symbol.
+        return [(self.symbols(char_set),)]
+
+
+class Utf8Alphabet(Alphabet):
+    # The alphabet of automata reading the UTF-8 encoding of the characters,
+    # one byte at a time. Its symbols are bytes, as the characters chr(0) to
+    # chr(255), and the classes group the bytes instead of the characters.
+    def __init__(self, char_sets: Iterable[CharSet]) -> None:
+        self.byte_sequences = {
+            char_set: [sequence for first, last in char_set for sequence in utf8_sequences(first, last)]
+            for char_set in char_sets
+        }
+        super().__init__((byte_range,)
+                         for sequences in self.byte_sequences.values()
+                         for sequence in sequences
+                         for byte_range in sequence)
+
+    def sequences(self, char_set: CharSet) -> list[tuple[set[str], ...]]:
+        return [tuple(self.symbols((byte_range,)) for byte_range in sequence)
+                for sequence in self.byte_sequences[char_set]]
+
+
+class SymbolClasses(dict):
+    # Maps characters to dense class ids. Only the representative symbols are
+    # stored up front, any other character is resolved through the alphabet on
+    # its first lookup (and -1 when it is in no class).
+    max_cached = 1 << 16
+
+    def __init__(self, class_ids: dict[str, int], alphabet: Alphabet | None = None) -> None:
+        super().__init__(class_ids)
+        self.class_ids = class_ids
+        self.alphabet = alphabet
+
+    def __missing__(self, char: str) -> int:
+        symbol = self.alphabet.symbol(char) if self.alphabet is not None else None
+        symbol_class = self.class_ids.get(symbol, -1)
+
+        if len(self) < self.max_cached:
+            self[char] = symbol_class
+        return symbol_class
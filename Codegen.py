@@ -0,0 +1,182 @@
+from types import ModuleType
+import hashlib
+import importlib.util
+import os
+
+from .DFA import CompiledDFA
+from .Lexer import Lexer, write_atomically
+
+# The characters below this code get their transitions written out in the
+# rows of every state, the others go through the class lookup.
+ROW_CHARS = 256
+
+# Bumped whenever generate_source writes different code. The cached modules
+# are keyed on it and on the template, a module written by an older
+# generator is never loaded.
+GENERATOR_VERSION = 2
+
+MODULE_TEMPLATE = '''\
+# Generated by Codegen from a compiled lexer, do not edit.
+from bisect import bisect_right
+
+NAMES = {names!r}
+REGEXES = {regexes!r}
+Q0 = {q0!r}
+NR_CLASSES = {nr_classes!r}
+LABELS = {labels!r}
+TRANSITIONS = {transitions!r}
+BOUNDARIES = {boundaries!r}
+SEGMENT_CLASSES = {segment_classes!r}
+CLASSES = {classes!r}
+MAX_CACHED = 1 << 16
+
+# The next state of every state by character, DEAD (-1) when it gets stuck.
+ROWS = [
+{rows}
+]
+
+
+def step(state, char):
+    # The transitions of the characters missing from the rows.
+    symbol_class = CLASSES.get(char)
+    if symbol_class is None:
+        segment = bisect_right(BOUNDARIES, ord(char)) - 1
+        symbol_class = SEGMENT_CLASSES[segment] if segment >= 0 else -1
+        if len(CLASSES) < MAX_CACHED:
+            CLASSES[char] = symbol_class
+
+    if symbol_class < 0:
+        return -1
+    return TRANSITIONS[state * NR_CLASSES + symbol_class]
+
+
+def lex(word):
+    rows, labels, names = ROWS, LABELS, NAMES
+    tokens = []
+    append = tokens.append
+
+    length = len(word)
+    line_number = 0
+    char_index = 1
+    initial_word_size = length
+    next_newline = word.find('\\n')
+    position = 0
+
+    while position < length:
+        match = -1
+        end = position
+
+        state = Q0
+        if state >= 0:
+            for index in range(position, length):
+                char = word[index]
+                try:
+                    next_state = rows[state][char]
+                except KeyError:
+                    next_state = step(state, char)
+                if next_state < 0:
+                    break
+                state = next_state
+
+                if labels[state] >= 0:
+                    match = labels[state]
+                    end = index + 1
+
+        if match < 0:
+            return error_at(word[position], char_index, line_number, initial_word_size)
+
+        append((names[match], word[position:end]))
+
+        char_index += end - position
+        if 0 <= next_newline < end:
+            line_number += word.count('\\n', position, end)
+            initial_word_size -= char_index
+            char_index = 1
+            next_newline = word.find('\\n', end)
+
+        position = end
+
+    return tokens
+
+
+def error_at(char, char_index, line_number, initial_word_size):
+    # The same message as Lexer.lex.
+    if not any(char in regex for regex in REGEXES):
+        char_index -= 1
+
+    displayed_char_index = str(char_index) if char_index < initial_word_size else 'EOF'
+    return [('', f'No viable alternative at character {{displayed_char_index}}, line {{line_number}}')]
+'''
+
+
+def generate_source(lexer: Lexer) -> str:
+    # A Python module lexing with the DFA of the lexer: the transitions of
+    # every state are a dict keyed by character, walked by a single loop
+    # with no function call per character.
+    table = lexer.table
+    if not isinstance(table, CompiledDFA):
+        raise TypeError('only a compiled (not lazy) lexer can be turned into source')
+    if lexer.utf8:
+        raise TypeError('the generated lex reads text, a UTF-8 lexer reads bytes')
+
+    classes = table.classes
+    alphabet = classes.alphabet
+    transitions = list(table.d)
+
+    if alphabet is not None:
+        boundaries = list(alphabet.boundaries)
+        segment_classes = [classes.class_ids.get(symbol, -1) for symbol in alphabet.segment_symbols]
+        row_chars = [chr(code) for code in range(ROW_CHARS)]
+    else:
+        boundaries, segment_classes = [], []
+        row_chars = sorted(classes.class_ids)
+
+    # The rows have every character below ROW_CHARS, the ones of no class lead to DEAD.
+    row_classes = {char: classes[char] for char in row_chars}
+    rows = []
+    for state in range(table.nr_states):
+        row = {char: transitions[state * table.nr_classes + symbol_class] if symbol_class >= 0 else -1
+               for char, symbol_class in row_classes.items()}
+        rows.append(f'    {row!r},')
+
+    return MODULE_TEMPLATE.format(
+        names=[token_name for token_name, _ in lexer.spec],
+        regexes=[regex for _, regex in lexer.spec],
+        q0=table.q0,
+        nr_classes=table.nr_classes,
+        labels=list(table.labels),
+        transitions=transitions,
+        boundaries=boundaries,
+        segment_classes=segment_classes,
+        classes=dict(classes.class_ids),
+        rows='\n'.join(rows),
+    )
+
+
+def module_digest(lexer: Lexer) -> str:
+    # The key of the generated module: the compiled lexer and what generates the code from it.
+    key = hashlib.sha256(f'{GENERATOR_VERSION} {ROW_CHARS}\n{MODULE_TEMPLATE}'.encode())
+    key.update(lexer.to_bytes())
+    return key.hexdigest()[:32]
+
+
+def load_module(lexer: Lexer, cache_dir: str | None = None) -> ModuleType:
+    # Returns the generated module of the lexer, with a lex function giving
+    # the same result as Lexer.lex. With a cache_dir the source is written
+    # there once per compiled lexer and generator version, and imported from
+    # the file afterwards, as lexer_<digest>.py (importable as such when the
+    # directory is on sys.path).
+    if cache_dir is None:
+        module = ModuleType('generated_lexer')
+        exec(compile(generate_source(lexer), '<generated lexer>', 'exec'), module.__dict__)
+        return module
+
+    name = 'lexer_' + module_digest(lexer)
+    path = os.path.join(cache_dir, name + '.py')
+    if not os.path.exists(path):
+        write_atomically(path, generate_source(lexer).encode('utf-8'))
+
+    module_spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return module
@@ -1,6 +1,216 @@
-from collections.abc import Callable
+from array import array
+from collections.abc import Callable, Hashable, Sequence
+from collections import defaultdict, deque
 from dataclasses import dataclass
-import functools
+import struct
+
+try:
+    import numpy
+except ImportError:
+    # accept_many falls back to accepting the words one by one.
+    numpy = None
+
+from .Alphabet import Alphabet, SymbolClasses
+
+DEAD = -1  # the sink of a compiled DFA, no final state can be reached from it
+
+# The most entries of the table accept_many builds with a column per Latin-1
+# code, larger DFAs read the classes of the codes instead.
+MAX_CODE_TABLE = 1 << 22
+
+# Section sizes of a serialized CompiledDFA: nr_segments, nr_classes, nr_states, q0.
+TABLE_HEADER = struct.Struct('=4i')
+
+
+@dataclass
+class CompiledDFA:
+    # Dense class id of every character, -1 for the characters no transition uses.
+    classes: SymbolClasses
+    nr_classes: int
+    q0: int
+    # Flat transition table, the next state of (state, class) is d[state * nr_classes + class].
+    d: array | memoryview
+    # Label of every state, -1 for the states that are not final.
+    labels: array | memoryview
+
+    @property
+    def nr_states(self) -> int:
+        return len(self.labels)
+
+    def accept(self, word: str) -> bool:
+        classes, transitions = self.classes, self.d
+        width = self.nr_classes
+        state = self.q0
+
+        for symbol in word:
+            if state == DEAD:
+                return False
+
+            symbol_class = classes[symbol]
+            if symbol_class < 0:
+                return False
+            state = transitions[state * width + symbol_class]
+
+        return state != DEAD and self.labels[state] >= 0
+
+    def accept_many(self, words: Sequence[str]) -> 'numpy.ndarray | list[bool]':
+        # Tells for every word whether it is accepted, as a boolean array with
+        # NumPy and as a list without it.
+        if numpy is None:
+            return [self.accept(word) for word in words]
+        if not words:
+            return numpy.empty(0, dtype=bool)
+
+        # The words joined by NULs, as Latin-1 bytes when they fit. The NULs
+        # give the starts of the words, unless a word contains one.
+        joined = '\0'.join(words)
+        try:
+            codes = numpy.frombuffer(joined.encode('latin-1'), dtype=numpy.uint8)
+        except UnicodeEncodeError:
+            codes = numpy.frombuffer(joined.encode('utf-32-le', 'surrogatepass'), dtype=numpy.uint32)
+        starts = numpy.zeros(len(words), dtype=numpy.int64)
+        separators = numpy.flatnonzero(codes == 0)
+        if len(separators) == len(words) - 1:
+            numpy.add(separators, 1, out=starts[1:])
+        else:
+            lengths = numpy.fromiter(map(len, words), dtype=numpy.int64, count=len(words))
+            numpy.cumsum(lengths[:-1] + 1, out=starts[1:])
+        # Every word ends on the NUL before the next one.
+        lengths = numpy.empty(len(words), dtype=numpy.int64)
+        numpy.subtract(starts[1:], starts[:-1] + 1, out=lengths[:-1])
+        lengths[-1] = len(codes) - starts[-1]
+
+        # The DEAD state and the characters with no class lead to an extra
+        # dead row, which only leads to itself. The rows are flattened and
+        # states are kept as the offsets of their rows. With Latin-1 codes
+        # the rows have a column per code and the codes are read as they are,
+        # else the codes are turned into classes first.
+        dead = self.nr_states
+        transitions = numpy.full((self.nr_states + 1, self.nr_classes + 1), dead, dtype=numpy.int64)
+        transitions[:dead, :self.nr_classes] = numpy.asarray(self.d, dtype=numpy.int64).reshape(
+            self.nr_states, self.nr_classes)
+        transitions[transitions == DEAD] = dead
+        if codes.dtype == numpy.uint8 and (self.nr_states + 1) * 256 <= MAX_CODE_TABLE:
+            symbols = codes
+            transitions = transitions[:, self.classes_of_codes(numpy.arange(256), self.nr_classes)]
+        else:
+            symbols = self.classes_of_codes(codes, self.nr_classes)
+        width = transitions.shape[1]
+        transitions = (transitions * width).ravel()
+        labels = numpy.append(numpy.asarray(self.labels, dtype=numpy.int32), -1)
+
+        # The words sorted by decreasing length: the ones still being read at
+        # step k are the first ones, all of them take their k-th step at once
+        # by reading symbols[k:] at their starts. Short lengths are sorted in
+        # linear time (radix sort), the fewer key bytes the faster.
+        max_length = int(lengths.max())
+        key_type = numpy.uint8 if max_length <= 0xFF else numpy.uint16 if max_length <= 0xFFFF else numpy.int64
+        order = numpy.argsort((max_length - lengths).astype(key_type), kind='stable')
+        starts = starts[order]
+        # The number of words longer than each step.
+        nr_active = (len(words) - numpy.cumsum(numpy.bincount(lengths)))[:max_length].tolist()
+
+        # Every step gathers into preallocated buffers, no array is allocated
+        # in the loop. The indices are always in range: the mode of take only
+        # spares the copy of out made in the default mode.
+        offsets = numpy.full(len(words), (dead if self.q0 == DEAD else self.q0) * width, dtype=numpy.int64)
+        indices = numpy.empty(len(words), dtype=numpy.int64)
+        for step, active in enumerate(nr_active):
+            step_indices, step_offsets = indices[:active], offsets[:active]
+            numpy.take(symbols[step:], starts[:active], out=step_indices, mode='wrap')
+            numpy.add(step_indices, step_offsets, out=step_indices)
+            numpy.take(transitions, step_indices, out=step_offsets, mode='wrap')
+
+        # Whether the state at every row offset is final.
+        final = numpy.zeros(len(transitions), dtype=bool)
+        final[::width] = labels >= 0
+        accepted = numpy.empty(len(words), dtype=bool)
+        accepted[order] = final[offsets]
+        return accepted
+
+    def classes_of_codes(self, codes: 'numpy.ndarray', no_class: int = -1) -> 'numpy.ndarray':
+        # The class of every code point, no_class when it has none.
+        alphabet = self.classes.alphabet
+        if alphabet is not None and alphabet.boundaries:
+            # The last segment has no class, the code points before the first
+            # boundary (segment -1) get it too.
+            segment_classes = numpy.array([self.classes.class_ids.get(symbol, no_class)
+                                           for symbol in alphabet.segment_symbols], dtype=numpy.int32)
+            boundaries = numpy.asarray(alphabet.boundaries)
+            if boundaries[-1] > 1 << 16:
+                return segment_classes[numpy.searchsorted(boundaries, codes, side='right') - 1]
+
+            # Small enough for a table of the class of every code point, the
+            # ones after the last boundary are clipped to it.
+            all_codes = numpy.arange(boundaries[-1] + 1)
+            class_of_code = segment_classes[numpy.searchsorted(boundaries, all_codes, side='right') - 1]
+        else:
+            class_of_code = numpy.full(max(map(ord, self.classes.class_ids), default=0) + 2, no_class,
+                                       dtype=numpy.int32)
+            for symbol, symbol_class in self.classes.class_ids.items():
+                class_of_code[ord(symbol)] = symbol_class
+
+        return numpy.take(class_of_code, codes, mode='clip')
+
+    def byte_rows(self) -> 'CompiledDFA':
+        # The same DFA with one class per byte (the characters chr(0) to
+        # chr(255)): every state gets a row of 256 transitions, indexed by
+        # the byte itself.
+        row_classes = [self.classes[chr(byte)] for byte in range(256)]
+        width = self.nr_classes
+        transitions = array('i')
+        for state in range(self.nr_states):
+            row = self.d[state * width:(state + 1) * width]
+            transitions.extend(row[symbol_class] if symbol_class >= 0 else DEAD
+                               for symbol_class in row_classes)
+
+        classes = SymbolClasses({chr(byte): byte for byte in range(256)})
+        return CompiledDFA(classes, 256, self.q0, transitions, array('i', self.labels))
+
+    def to_bytes(self) -> bytes:
+        # The header is followed by a single native int array: the alphabet
+        # segments, the symbol of every class, the transitions and the labels.
+        alphabet = self.classes.alphabet
+        boundaries = alphabet.boundaries if alphabet is not None else []
+        segment_symbols = alphabet.segment_symbols if alphabet is not None else []
+        class_symbols = sorted(self.classes.class_ids, key=self.classes.class_ids.get)
+
+        body = array('i', boundaries)
+        body.extend(ord(symbol) if symbol is not None else -1 for symbol in segment_symbols)
+        body.extend(map(ord, class_symbols))
+        body.extend(self.d)
+        body.extend(self.labels)
+
+        return TABLE_HEADER.pack(len(boundaries), self.nr_classes, self.nr_states, self.q0) + body.tobytes()
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview) -> 'CompiledDFA':
+        # The transitions and labels stay views over the buffer, nothing is
+        # copied when it is a memory mapped file.
+        nr_segments, nr_classes, nr_states, q0 = TABLE_HEADER.unpack_from(buffer)
+        body = memoryview(buffer)[TABLE_HEADER.size:]
+        if len(body) != (2 * nr_segments + nr_classes + nr_states * (nr_classes + 1)) * array('i').itemsize:
+            raise ValueError('truncated or corrupted compiled DFA')
+        body = body.cast('i')
+
+        boundaries = body[:nr_segments]
+        segment_symbols = body[nr_segments:2 * nr_segments]
+        offset = 2 * nr_segments
+        class_symbols = body[offset:offset + nr_classes]
+        offset += nr_classes
+        transitions = body[offset:offset + nr_states * nr_classes]
+        offset += nr_states * nr_classes
+        labels = body[offset:offset + nr_states]
+
+        alphabet = None
+        if nr_segments:
+            alphabet = Alphabet.from_segments(
+                boundaries.tolist(),
+                [chr(code) if code >= 0 else None for code in segment_symbols]
+            )
+        class_ids = {chr(code): symbol_class for symbol_class, code in enumerate(class_symbols)}
+
+        return cls(SymbolClasses(class_ids, alphabet), nr_classes, q0, transitions, labels)
 
 
 @dataclass
@@ -10,18 +220,18 @@ class DFA[STATE]:
     q0: STATE
     d: dict[tuple[STATE, str], STATE]
     F: set[STATE]
+    # The alphabet whose classes the symbols stand for, None when they are characters.
+    alphabet: Alphabet | None = None
 
 
+    # The DFA is compiled on every call: its fields may change between calls.
+    # To run it many times, compile it once and use the CompiledDFA, like the
+    # lexer does.
     def accept(self, word: str) -> bool:
-        transitions = self.d
-
-        def update_state(state, symbol): # Moving to the next state.
-            return transitions.get((state, symbol), None)
-        
-        # Reducing the word to a single state. (functools.reduce is kind of a foldl in python).
-        final_state = functools.reduce(update_state, word, self.q0)
+        return self.compile().accept(word)
 
-        return final_state is not None and final_state in self.F
+    def accept_many(self, words: Sequence[str]) -> 'numpy.ndarray | list[bool]':
+        return self.compile().accept_many(words)
 
     def remap_states[OTHER_STATE](self, f: Callable[[STATE], 'OTHER_STATE']) -> 'DFA[OTHER_STATE]':
         # Appling the function f to each state of the DFA.
@@ -36,5 +246,158 @@ class DFA[STATE]:
             K=set(states),
             q0=new_q0,
             d=new_d,
-            F=new_F
-        )
\ No newline at end of file
+            F=new_F,
+            alphabet=self.alphabet
+        )
+
+    def minimize(self, label: Callable[[STATE], Hashable] | None = None) -> 'DFA[frozenset[STATE]]':
+        # Hopcroft's partition refinement. Final states are first grouped by
+        # label(state), so states that accept different things are never merged.
+        if label is None:
+            label = lambda state: None
+
+        # A missing transition behaves like a transition to a non-final sink.
+        sink = object()
+        states = list(self.K)
+        if any((state, symbol) not in self.d for state in self.K for symbol in self.S):
+            states.append(sink)
+
+        predecessors = {symbol: defaultdict(set) for symbol in self.S}
+        for state in states:
+            for symbol in self.S:
+                next_state = self.d.get((state, symbol), sink) if state is not sink else sink
+                predecessors[symbol][next_state].add(state)
+
+        groups = defaultdict(set)
+        for state in states:
+            groups[(True, label(state)) if state in self.F else (False, None)].add(state)
+
+        blocks = list(groups.values())
+        block_of = {state: index for index, block in enumerate(blocks) for state in block}
+
+        # Every initial block but the largest one is used as a splitter.
+        largest = max(range(len(blocks)), key=lambda index: len(blocks[index]))
+        worklist = deque(index for index in range(len(blocks)) if index != largest)
+        in_worklist = set(worklist)
+
+        while worklist:
+            splitter = worklist.popleft()
+            in_worklist.discard(splitter)
+            splitter_states = set(blocks[splitter])
+
+            for symbol in self.S:
+                # The states that move into the splitter on this symbol, grouped by block.
+                touched = defaultdict(set)
+                for state in splitter_states:
+                    for predecessor in predecessors[symbol].get(state, ()):
+                        touched[block_of[predecessor]].add(predecessor)
+
+                for index, inside in touched.items():
+                    if len(inside) == len(blocks[index]):
+                        continue
+
+                    # Splitting the block, the part moving into the splitter gets a new index.
+                    blocks[index] -= inside
+                    blocks.append(inside)
+                    new_index = len(blocks) - 1
+                    for state in inside:
+                        block_of[state] = new_index
+
+                    if index in in_worklist:
+                        worklist.append(new_index)
+                        in_worklist.add(new_index)
+                    else:
+                        smaller = index if len(blocks[index]) < len(inside) else new_index
+                        worklist.append(smaller)
+                        in_worklist.add(smaller)
+
+        # The states from which no final state can be reached collapse into one
+        # block, represented like the sink of subset_construction.
+        reaches_final = self.states_reaching_final()
+
+        block_states = [frozenset(block) for block in blocks]
+
+        def block(state):
+            if state not in reaches_final:
+                return frozenset()
+            return block_states[block_of[state]]
+
+        new_K = {block(state) for state in self.K}
+        new_d = {(block(src), symbol): block(dest) for (src, symbol), dest in self.d.items()}
+        if sink in block_of:
+            for new_state in new_K:
+                for symbol in self.S:
+                    new_d.setdefault((new_state, symbol), frozenset())
+            new_K.add(frozenset())
+
+        return DFA(
+            S=self.S,
+            K=new_K,
+            q0=block(self.q0),
+            d=new_d,
+            F={block(state) for state in self.F},
+            alphabet=self.alphabet
+        )
+
+    def states_reaching_final(self) -> set[STATE]:
+        predecessors = defaultdict(set)
+        for (src, _), dest in self.d.items():
+            predecessors[dest].add(src)
+
+        # Walking the transitions backwards from the final states.
+        reaches_final = set(self.F)
+        queue = deque(self.F)
+        while queue:
+            state = queue.popleft()
+            for predecessor in predecessors[state]:
+                if predecessor not in reaches_final:
+                    reaches_final.add(predecessor)
+                    queue.append(predecessor)
+
+        return reaches_final
+
+    def compile(self, label: Callable[[STATE], int] | None = None,
+                alphabet: Alphabet | None = None) -> CompiledDFA:
+        # Final states get label(state) in the compiled DFA, 0 by default.
+        # When the DFA runs over the classes of an alphabet (its own by
+        # default), every character is looked up through the class of its
+        # representative symbol.
+        if label is None:
+            label = lambda state: 0
+        if alphabet is None:
+            alphabet = self.alphabet
+
+        # Numbering the states in breadth-first order from q0, so the rows used
+        # together stay close in the table. The states that cannot reach a final
+        # state are all replaced by DEAD and get no row.
+        reaches_final = self.states_reaching_final()
+        numbering = {}
+        if self.q0 in reaches_final:
+            numbering[self.q0] = 0
+            queue = deque([self.q0])
+            successors = defaultdict(set)
+            for (src, _), dest in self.d.items():
+                successors[src].add(dest)
+
+            while queue:
+                state = queue.popleft()
+                for next_state in successors[state]:
+                    if next_state in reaches_final and next_state not in numbering:
+                        numbering[next_state] = len(numbering)
+                        queue.append(next_state)
+
+        class_ids = {symbol: symbol_class for symbol_class, symbol in enumerate(sorted(self.S))}
+        width = len(class_ids)
+        dfa = self.remap_states(lambda state: numbering.get(state, DEAD))
+
+        transitions = array('i', [DEAD]) * (len(numbering) * width)
+        for (src, symbol), dest in dfa.d.items():
+            if src != DEAD:
+                transitions[src * width + class_ids[symbol]] = dest
+
+        labels = array('i', [-1]) * len(numbering)
+        for state in self.F:
+            if state in numbering:
+                labels[numbering[state]] = label(state)
+
+        return CompiledDFA(SymbolClasses(class_ids, alphabet), width, dfa.q0, transitions, labels)
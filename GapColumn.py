@@ -0,0 +1,88 @@
+from array import array
+from collections.abc import Iterator, Sequence
+from itertools import chain, islice
+
+
+class GapColumn:
+    # A column of integers edited in place, as a gap buffer: the values are
+    # kept in one array with a gap where the last edit was made, so an edit
+    # only moves the values between it and the previous one. The values after
+    # the gap are stored less shift: the edits moving all the values after
+    # them by the same amount (offsets after an edit changing the size of the
+    # input) only change shift.
+    def __init__(self, data: array) -> None:
+        self.data = data
+        self.typecode = data.typecode
+        # The gap is data[gap_start:gap_end].
+        self.gap_start = self.gap_end = len(data)
+        self.shift = 0
+
+    def __len__(self) -> int:
+        return len(self.data) - (self.gap_end - self.gap_start)
+
+    def __getitem__(self, index: int | slice) -> 'int | array':
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return array(self.typecode, [self[offset] for offset in range(start, stop, step)])
+            gap = self.gap_end - self.gap_start
+            values = self.data[start:max(start, min(stop, self.gap_start))]
+            after = self.data[max(start, self.gap_start) + gap:max(stop, self.gap_start) + gap]
+            values.extend(map(self.shift.__add__, after) if self.shift else after)
+            return values
+
+        index = self.position(index)
+        if index < self.gap_start:
+            return self.data[index]
+        return self.data[index + self.gap_end - self.gap_start] + self.shift
+
+    def __setitem__(self, index: int, value: int) -> None:
+        index = self.position(index)
+        if index < self.gap_start:
+            self.data[index] = value
+        else:
+            self.data[index + self.gap_end - self.gap_start] = value - self.shift
+
+    def position(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('column index out of range')
+        return index
+
+    def __iter__(self) -> Iterator[int]:
+        after = islice(self.data, self.gap_end, None)
+        return chain(islice(self.data, self.gap_start),
+                     map(self.shift.__add__, after) if self.shift else after)
+
+    def append(self, value: int) -> None:
+        self.data.append(value - self.shift)
+
+    def move_gap(self, index: int) -> None:
+        # Moves the values between index and the gap to the other side of it.
+        data, gap, shift = self.data, self.gap_end - self.gap_start, self.shift
+        if index < self.gap_start and (gap or shift):
+            moved = data[index:self.gap_start]
+            data[index + gap:self.gap_end] = array(self.typecode, map((-shift).__add__, moved))
+        elif index > self.gap_start and (gap or shift):
+            moved = data[self.gap_end:index + gap]
+            data[self.gap_start:index] = array(self.typecode, map(shift.__add__, moved))
+        self.gap_start, self.gap_end = index, index + gap
+
+    def replace(self, start: int, stop: int, values: Sequence[int], delta: int = 0) -> None:
+        # Replaces the values [start, stop) with values and adds delta to the values after them.
+        self.move_gap(start)
+        self.gap_end += stop - start
+        self.shift += delta
+
+        if len(values) > self.gap_end - self.gap_start:
+            # The gap grows with the column, inserting stays linear in the values inserted.
+            grown = len(values) - (self.gap_end - self.gap_start) + max(len(self) >> 3, 64)
+            self.data[self.gap_end:self.gap_end] = array(self.typecode, bytes(grown * self.data.itemsize))
+            self.gap_end += grown
+
+        self.data[self.gap_start:self.gap_start + len(values)] = array(self.typecode, values)
+        self.gap_start += len(values)
+
+    def to_array(self) -> array:
+        return self[:]
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class LRUCache[VALUE]:
+    # Keeps the values of the max_size most recently used keys. The size can
+    # be changed at any time, a max_size of 0 disables the cache.
+    def __init__(self, max_size: int = 128) -> None:
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> VALUE | None:
+        try:
+            value = self.entries[key]
+            self.entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: VALUE) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def resize(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.evict()
+
+    def evict(self) -> None:
+        while len(self.entries) > max(self.max_size, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
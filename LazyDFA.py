@@ -0,0 +1,140 @@
+from array import array
+from collections import deque
+
+from .Alphabet import Alphabet, SymbolClasses
+from .DFA import DEAD
+from .NFA import NFA
+
+UNKNOWN = -2  # a transition of a lazy DFA that was not built yet
+
+
+class LazyDFA:
+    # Runs an NFA as a DFA whose states are only built when the input reaches
+    # them. It has the same fields as a CompiledDFA, except that transitions
+    # may be UNKNOWN: step computes those from the NFA and caches the result.
+    # When the cache outgrows its memory budget, all the states are dropped and
+    # built again on demand, a new generation starts each time. Lexing changes
+    # the cache: threads lex with their own copies.
+    def __init__(self, nfa: NFA[int], label_of_state: dict[int, int],
+                 alphabet: Alphabet | None = None, memory_budget: int = 1 << 20) -> None:
+        self.closures = nfa.epsilon_closures()
+        self.outgoing = nfa.outgoing_transitions()
+        self.label_of_state = label_of_state
+        self.memory_budget = memory_budget
+
+        # The NFA states that can still reach a final state, the others are
+        # left out of the DFA states. A DFA state left empty is DEAD.
+        predecessors = {}
+        for state, transitions in self.outgoing.items():
+            for next_states in transitions.values():
+                for next_state in next_states:
+                    predecessors.setdefault(next_state, set()).add(state)
+        for state, closure in self.closures.items():
+            for next_state in closure:
+                predecessors.setdefault(next_state, set()).add(state)
+
+        self.live = set(nfa.F)
+        queue = deque(nfa.F)
+        while queue:
+            state = queue.popleft()
+            for predecessor in predecessors.get(state, ()):
+                if predecessor not in self.live:
+                    self.live.add(predecessor)
+                    queue.append(predecessor)
+
+        self.class_symbols = sorted(nfa.S)
+        self.classes = SymbolClasses({symbol: symbol_class for symbol_class, symbol
+                                      in enumerate(self.class_symbols)}, alphabet)
+        self.nr_classes = len(self.class_symbols)
+
+        self.start_set = self.closures[nfa.q0] & self.live
+        self.d = array('i')
+        self.labels = array('i')
+        self.generation = 0
+        # The states built since the DFA was created, flushed ones included.
+        self.states_built = 0
+        self.flush()
+
+    def copy(self) -> 'LazyDFA':
+        # The same DFA with an empty cache of its own, the analysis of the NFA is shared.
+        copy = LazyDFA.__new__(LazyDFA)
+        copy.__dict__.update(self.__dict__)
+        copy.d = array('i')
+        copy.labels = array('i')
+        copy.generation = 0
+        copy.states_built = 0
+        copy.flush()
+        return copy
+
+    @property
+    def nr_states(self) -> int:
+        return len(self.labels)
+
+    def flush(self) -> None:
+        # The arrays are emptied in place, the lexer may hold references to them.
+        self.sets = []
+        self.ids = {}
+        del self.d[:]
+        del self.labels[:]
+        self.memory_used = 0
+        self.generation += 1
+        self.q0 = self.add_state(self.start_set) if self.start_set else DEAD
+
+    def add_state(self, nfa_states: frozenset[int]) -> int:
+        state = self.ids.get(nfa_states)
+        if state is not None:
+            return state
+
+        state = len(self.sets)
+        self.sets.append(nfa_states)
+        self.ids[nfa_states] = state
+        self.d.extend([UNKNOWN] * self.nr_classes)
+        labels = [self.label_of_state[s] for s in nfa_states if s in self.label_of_state]
+        self.labels.append(min(labels) if labels else -1)
+        self.memory_used += self.state_cost(nfa_states)
+        self.states_built += 1
+
+        return state
+
+    def state_cost(self, nfa_states: frozenset[int]) -> int:
+        # Rough size in bytes: the transitions row, the NFA states set and the bookkeeping.
+        return self.d.itemsize * self.nr_classes + 8 * len(nfa_states) + 300
+
+    def step(self, state: int, symbol_class: int) -> int:
+        nfa_states = self.sets[state]
+        symbol = self.class_symbols[symbol_class]
+
+        next_nfa_states = set()
+        for nfa_state in nfa_states:
+            for next_state in self.outgoing[nfa_state].get(symbol, ()):
+                next_nfa_states |= self.closures[next_state]
+        next_nfa_states = frozenset(next_nfa_states & self.live)
+
+        if not next_nfa_states:
+            next_state = DEAD
+        else:
+            next_state = self.ids.get(next_nfa_states)
+            if next_state is None:
+                if self.memory_used + self.state_cost(next_nfa_states) > self.memory_budget:
+                    # Starting over, the current state is kept so the transition can be cached.
+                    self.flush()
+                    state = self.add_state(nfa_states)
+                next_state = self.add_state(next_nfa_states)
+
+        self.d[state * self.nr_classes + symbol_class] = next_state
+        return next_state
+
+    def accept(self, word: str) -> bool:
+        state = self.q0
+
+        for symbol in word:
+            if state == DEAD:
+                return False
+
+            symbol_class = self.classes[symbol]
+            if symbol_class < 0:
+                return False
+            next_state = self.d[state * self.nr_classes + symbol_class]
+            state = next_state if next_state != UNKNOWN else self.step(state, symbol_class)
+
+        return state != DEAD and self.labels[state] >= 0
@@ -1,68 +1,906 @@
-from src.Regex import parse_regex
+from bisect import bisect_left, bisect_right
+from collections.abc import AsyncIterator, Callable, Generator, Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import batched, repeat
+from typing import TextIO
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+from src.Alphabet import Alphabet, Utf8Alphabet
+from src.DFA import DEAD, DFA, CompiledDFA
+from src.LazyDFA import LazyDFA
+from src.LRUCache import LRUCache
+from src.NFA import NFA, EPSILON
+from src.NewlineIndex import NewlineIndex
+from src.Regex import Regex, ThompsonBuilder, character_sets, parse_regex
+from src.Stats import CompileStats, LexStats, StatsHook, no_phase
+from src.TokenStream import Source, Token, TokenStream
+
+# Compiled lexer files start with the magic, the format version, the byte order
+# of the table, the mode flags and the size of the spec, stored as JSON before the table.
+FILE_MAGIC = b'LEXC'
+FORMAT_VERSION = 2
+FILE_HEADER = struct.Struct('=4sIcBxxI')
+UTF8_FLAG = 1
+BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+# The tables compiled lately, by spec and options. Lexers built again from the
+# same spec share the table instead of compiling it again.
+compiled_tables = LRUCache(32)
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    # Writes data to a temporary file in the same directory first, then moves
+    # it to path: readers never see a partial file.
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        os.unlink(temporary_path)
+        raise
+
+
+# The lexer of a worker process of lex_parallel, set once by init_worker.
+worker_lexer = None
+
+
+# The lexers of the pools made by Lexer.process_pool, by pool.
+pool_lexers = weakref.WeakKeyDictionary()
+
+
+def init_worker(lexer: 'Lexer') -> None:
+    global worker_lexer
+    worker_lexer = lexer
+
+
+def lex_chunk(text: str, start: int, end: int, at_end: bool, linear: bool,
+              lines: bool) -> tuple[TokenStream, int | None]:
+    # Lexes the tokens starting in [start, end) of the input, as if a token
+    # started at start. text is the input from start on: up to its end when
+    # at_end, else the chunk and a part of what follows, where the last token
+    # may end. The tokens stop before a token that could go on past text, the
+    # caller lexes it. The lines are counted from start, and the position of
+    # the error, if any, is returned.
+    lexer = worker_lexer
+    # The tokens are sent back without their source, only the offsets are needed.
+    tokens = TokenStream([token_name for token_name, _ in lexer.spec], '', with_lines=lines)
+    failed = set() if linear else None
+    line_number = 0
+
+    position = 0
+    while position < end - start:
+        token_index, token_end, stop = lexer.longest_match(text, position, failed)
+        if stop == len(text) and not at_end:
+            return tokens, None
+        if token_index is None:
+            return tokens, start + position
+
+        tokens.append(token_index, start + position, start + token_end, line_number)
+        if lines:
+            line_number += text.count('\n', position, token_end)
+        position = token_end
+
+    return tokens, None
+
+
+# The lexers unpickled in this process, by digest of their compiled form.
+loaded_lexers = {}
+max_loaded_lexers = 16
+
+
+def loaded_lexer(key: Hashable, load: Callable[[], 'Lexer']) -> 'Lexer':
+    # A lexer is sent along with every batch of lex_many, it is only rebuilt
+    # the first time a process receives it.
+    lexer = loaded_lexers.get(key)
+    if lexer is None:
+        if len(loaded_lexers) >= max_loaded_lexers:
+            loaded_lexers.clear()
+        lexer = loaded_lexers[key] = load()
+    return lexer
+
+
+def load_lexer(digest: bytes, lexer_bytes: bytes) -> 'Lexer':
+    return loaded_lexer(digest, partial(Lexer.from_buffer, lexer_bytes))
+
+
+def load_lexer_file(cache_key: str, path: str) -> 'Lexer':
+    # A lexer of the on-disk cache is sent as the path of its file, which
+    # every process maps instead of receiving the table.
+    return loaded_lexer(cache_key, partial(Lexer.from_file, path))
+
+
+def load_lazy_lexer(spec: list[tuple[str, str]], memory_budget: int, utf8: bool) -> 'Lexer':
+    # A lazy lexer has no table to send, it is built again from its spec.
+    return loaded_lexer((tuple(map(tuple, spec)), memory_budget, utf8),
+                        partial(Lexer, spec, True, True, memory_budget, utf8))
+
+
+# The copies of the lazy lexers lexing in each thread of lex_many, by lexer.
+thread_lexers = threading.local()
+
+
+def thread_lexer(lexer: 'Lexer') -> 'Lexer':
+    # A lazy DFA builds its states while lexing and cannot be shared between
+    # threads: every thread lexes with its own copy, made the first time.
+    copies = getattr(thread_lexers, 'copies', None)
+    if copies is None:
+        copies = thread_lexers.copies = weakref.WeakKeyDictionary()
+    copy = copies.get(lexer)
+    if copy is None:
+        copy = copies[lexer] = Lexer.from_table(lexer.spec, lexer.table.copy(), lexer.utf8)
+    return copy
+
+
+def lex_batch(lexer: 'Lexer | None', words: Sequence[str], linear: bool) -> list[list[tuple[str, str]]]:
+    # Without lexer, the words go to the lexer the worker got when it started.
+    if lexer is None:
+        lexer = worker_lexer
+    if isinstance(lexer.table, LazyDFA):
+        lexer = thread_lexer(lexer)
+    return [lexer.lex(word, linear) for word in words]
+
 
 class Lexer:
-    dfa_spec = {}
     spec = {}
+    table = None
+    # A UTF-8 lexer reads bytes: its automaton runs on the UTF-8 encoding of the spec.
+    utf8 = False
+    # Inputs split in chunks smaller than this are lexed sequentially by lex_parallel.
+    min_parallel_chunk = 1 << 16
+    # The input past its chunk sent to a worker of lex_parallel, for the last
+    # token of the chunk. A longer token is lexed again by lex_parallel itself.
+    chunk_overlap = 1 << 12
+    # The batches lex_many keeps submitted to its executor at once.
+    max_pending_batches = 64
+    # What the lexer pickles to, computed the first time it is sent.
+    reduced = None
+    # The file of the on-disk cache the lexer was loaded from or written to.
+    cache_path = None
+    # With stats on, building the lexer and every tokenize call keep their
+    # stats in compile_stats and lex_stats (and in the stats of the token
+    # stream), and hand them to on_stats when it is set. They can be turned
+    # on and off at any time, tokenize checks them once per call. lex,
+    # lex_file, lex_stream and alex keep them too. tokenize_parallel and
+    # lex_many in worker processes do not: the workers lex without stats.
+    stats = False
+    on_stats = None
+    compile_stats = None
+    lex_stats = None
 
-    def __init__(self, spec: list[tuple[str, str]]) -> None:
+    def __init__(self, spec: list[tuple[str, str]], minimize: bool = True,
+                 lazy: bool = False, memory_budget: int = 1 << 20, utf8: bool = False,
+                 stats: bool = False, on_stats: StatsHook | None = None) -> None:
         self.spec = spec
-        self.dfa_spec = {}
+        self.utf8 = utf8
+        if stats or on_stats is not None:
+            self.stats = True
+            self.on_stats = on_stats
+
+        # Compiled tables are never modified, lazy ones grow while lexing.
+        # With stats on the table is always compiled, there would be nothing to measure.
+        key = (tuple(map(tuple, spec)), minimize, utf8)
+        if not lazy and not self.stats:
+            self.table = compiled_tables.get(key)
+            if self.table is not None:
+                return
+
+        compile_stats = CompileStats() if self.stats else None
+        phase = compile_stats.phase if compile_stats is not None else no_phase
+
+        # The automata work on the character classes of the spec instead of
+        # single characters: all the characters of a class behave the same way.
+        # In UTF-8 mode the classes group the bytes of the encoded characters.
+        with phase('parse'):
+            regexes = [parse_regex(regex) for _, regex in spec]
+        with phase('alphabet'):
+            alphabet = (Utf8Alphabet if utf8 else Alphabet)(
+                char_set for regex in regexes for char_set in character_sets(regex))
+
+        # A single DFA recognises every token at once. Each of its final states
+        # is labelled with the index (in spec order) of the token it accepts.
+        with phase('thompson'):
+            nfa, token_of_state = self.build_combined_nfa(regexes, alphabet)
+
+        if lazy:
+            # The DFA states are only built when the input reaches them, and
+            # kept within memory_budget bytes.
+            with phase('lazy'):
+                self.table = LazyDFA(nfa, token_of_state, alphabet, memory_budget)
+            if compile_stats is not None:
+                self.report_compile(compile_stats, regexes, alphabet, nfa, None, None)
+            return
+
+        with phase('subset_construction'):
+            dfa = nfa.subset_construction()
+            final_tokens = {
+                state: min(token_of_state[s] for s in state if s in token_of_state)
+                for state in dfa.F
+            }
+        subset_dfa = dfa
+
+        if minimize:
+            # States labelled with different tokens stay apart, so every block
+            # of the minimal DFA still accepts a single token.
+            with phase('minimize'):
+                dfa = dfa.minimize(final_tokens.get)
+                final_tokens = {block: final_tokens[next(iter(block))] for block in dfa.F}
+
+        # The lexer runs on the compiled table, labels hold token indexes.
+        with phase('compile'):
+            self.table = dfa.compile(final_tokens.get, alphabet)
+            if utf8:
+                # Each state gets 256 transitions, the bytes need no class lookup.
+                self.table = self.table.byte_rows()
+        compiled_tables.put(key, self.table)
+
+        if compile_stats is not None:
+            self.report_compile(compile_stats, regexes, alphabet, nfa, subset_dfa,
+                                dfa if minimize else None)
+
+    def report_compile(self, compile_stats: CompileStats, regexes: list[Regex], alphabet: Alphabet,
+                       nfa: NFA[int], dfa: DFA | None, minimal_dfa: DFA | None) -> None:
+        # Each token is also compiled alone, to tell which ones make the DFA
+        # large. Lazy lexers (without a DFA) only get the NFA sizes: compiling
+        # the DFA of a token could blow up the way the lazy DFA avoids.
+        compile_stats.nfa_states = len(nfa.K)
+        compile_stats.dfa_states = len(dfa.K) if dfa is not None else self.table.nr_states
+        compile_stats.minimal_dfa_states = len(minimal_dfa.K) if minimal_dfa is not None else None
+        compile_stats.classes = self.table.nr_classes
+
+        with compile_stats.phase('token_sizes'):
+            for (token_name, _), regex in zip(self.spec, regexes):
+                token_nfa = regex.thompson(alphabet)
+                token_dfa_states = len(token_nfa.subset_construction().K) if dfa is not None else None
+                compile_stats.token_sizes[token_name] = (len(token_nfa.K), token_dfa_states)
+
+        self.compile_stats = compile_stats
+        if self.on_stats is not None:
+            self.on_stats(compile_stats)
+
+    @classmethod
+    def from_table(cls, spec: list[tuple[str, str]], table: CompiledDFA, utf8: bool = False) -> 'Lexer':
+        lexer = cls.__new__(cls)
+        lexer.spec = spec
+        lexer.table = table
+        lexer.utf8 = utf8
+        return lexer
+
+    @classmethod
+    def from_spec(cls, spec: list[tuple[str, str]], cache_dir: str | None = None,
+                  minimize: bool = True, utf8: bool = False) -> 'Lexer':
+        if cache_dir is None:
+            return cls(spec, minimize, utf8=utf8)
+
+        # Loading the compiled lexer from the cache when it is there. The file
+        # is memory mapped, so all the processes using it share the same pages.
+        path = os.path.join(cache_dir, cls.cache_key(spec, minimize, utf8) + '.lexc')
+        try:
+            lexer = cls.from_file(path)
+            if lexer.spec == [tuple(token) for token in spec] and lexer.utf8 == utf8:
+                return lexer
+        except (OSError, ValueError, struct.error):
+            # Missing, truncated or written by another format version.
+            pass
+
+        lexer = cls(spec, minimize, utf8=utf8)
+        write_atomically(path, lexer.to_bytes())
+        lexer.cache_path = path
+        return lexer
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Lexer':
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        lexer = cls.from_buffer(buffer)
+        lexer.cache_path = path
+        return lexer
+
+    @staticmethod
+    def cache_key(spec: list[tuple[str, str]], minimize: bool = True, utf8: bool = False) -> str:
+        key = json.dumps([FORMAT_VERSION, minimize, utf8, spec])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def to_bytes(self) -> bytes:
+        if isinstance(self.table, LazyDFA):
+            raise TypeError('a lazy lexer builds its DFA while lexing, it cannot be serialized')
+
+        spec = json.dumps(self.spec).encode()
+        # Padding the spec so the table starts 4 bytes aligned.
+        padding = b'\0' * (-len(spec) % 4)
+        flags = UTF8_FLAG if self.utf8 else 0
+        header = FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, BYTE_ORDER, flags, len(spec))
+
+        return header + spec + padding + self.table.to_bytes()
+
+    def __reduce__(self) -> tuple:
+        # Every process builds or loads a lexer it receives once: a lazy lexer
+        # is sent as its spec, a lexer of the cache as the path of its file,
+        # any other one as its compiled form, the same bytes as the cache files.
+        if self.reduced is None:
+            if isinstance(self.table, LazyDFA):
+                self.reduced = load_lazy_lexer, (self.spec, self.table.memory_budget, self.utf8)
+            elif self.cache_path is not None:
+                self.reduced = load_lexer_file, (os.path.basename(self.cache_path), self.cache_path)
+            else:
+                lexer_bytes = self.to_bytes()
+                self.reduced = load_lexer, (hashlib.sha256(lexer_bytes).digest(), lexer_bytes)
+        return self.reduced
+
+    def process_pool(self, workers: int | None = None) -> ProcessPoolExecutor:
+        # A process pool whose workers receive the lexer once, when they
+        # start: lex_many then sends them only the words.
+        executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(self,))
+        pool_lexers[executor] = self
+        return executor
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | mmap.mmap) -> 'Lexer':
+        magic, version, byte_order, flags, spec_size = FILE_HEADER.unpack_from(buffer)
+        if magic != FILE_MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER:
+            raise ValueError('not a compiled lexer of the current format version')
+
+        offset = FILE_HEADER.size
+        spec = [tuple(token) for token in json.loads(bytes(buffer[offset:offset + spec_size]))]
+        offset += spec_size + (-spec_size % 4)
+
+        return cls.from_table(spec, CompiledDFA.from_buffer(memoryview(buffer)[offset:]),
+                              bool(flags & UTF8_FLAG))
+
+    def build_combined_nfa(self, regexes: list[Regex],
+                           alphabet: Alphabet | None = None) -> tuple[NFA[int], dict[int, int]]:
+        # Every token is built into the same NFA, the new initial state can start any of them.
+        builder = ThompsonBuilder(alphabet)
+        initial_state = builder.new_state()
+        token_of_state = {}
+
+        for token_index, regex in enumerate(regexes):
+            token_initial_state, token_final_state = builder.build(regex)
+            builder.add_transition(initial_state, EPSILON, token_initial_state)
+            token_of_state[token_final_state] = token_index
+
+        return builder.nfa(initial_state, set(token_of_state)), token_of_state
+
+    def lex(self, word: str, linear: bool = False) -> list[tuple[str, str]] | None:
+        return self.tokenize(word, linear).to_list()
+
+    def tokenize(self, word: Source | memoryview, linear: bool = False, lines: bool = False,
+                 incremental: bool = False) -> TokenStream:
+        # Bytes are matched as the characters with the same code (latin-1), or
+        # as UTF-8 by a UTF-8 lexer, which lexes text as its UTF-8 encoding.
+        # Offsets and error positions are then counted in bytes.
+        # Incremental streams remember how far each token was scanned, for relex.
+        if linear and incremental:
+            # The failed pairs cut scans short on what earlier scans read.
+            raise ValueError('linear mode does not record how far tokens were scanned')
 
-        # Creating a DFA for each token
-        for token_name, regex in spec:
-            dfa = parse_regex(regex).thompson().subset_construction()
-            self.dfa_spec[token_name] = dfa
+        if self.utf8 and isinstance(word, str):
+            word = word.encode()
+        elif isinstance(word, memoryview):
+            # Memory views cannot be searched for newlines, their bytes are copied once.
+            word = word.tobytes()
 
-    def lex(self, word: str) -> list[tuple[str, str]] | None:
-        result = []
-        matches = []
+        classes = None if isinstance(word, str) else [self.table.classes[chr(byte)] for byte in range(256)]
 
+        tokens = TokenStream([token_name for token_name, _ in self.spec], word,
+                             'utf-8' if self.utf8 else 'latin-1', lines, incremental)
+        # In linear mode we remember the (DFA state, position) pairs from which no
+        # token can be accepted anymore, so no part of the input is rescanned
+        # from the same state twice (Reps' tabulation). This bounds the whole
+        # run to O(len(word)) even for specs like a and a*b on a run of a's.
+        failed = set() if linear else None
+
+        append_id, append_start, append_end = (tokens.token_ids.append, tokens.starts.append,
+                                               tokens.ends.append)
+        append_reach = tokens.reaches.append if incremental else None
+        reach = 0
+
+        lex_stats = LexStats(tokens.names, len(word)) if self.stats else None
+        if lex_stats is not None:
+            started = self.start_lex()
+
+        # Positions are not tracked while lexing: the lines, and the error
+        # message when there is one, are computed from the newline index of the
+        # input afterwards.
+        position = 0
+        while position < len(word):
+            token_index, end, stop = self.longest_match(word, position, failed, classes)
+
+            if token_index is None:
+                tokens.error = self.error_after(tokens, position)
+                if lex_stats is not None:
+                    lex_stats.record_failure(position, stop)
+                break
+
+            if lex_stats is not None:
+                lex_stats.record(token_index, position, end, stop)
+            append_id(token_index)
+            append_start(position)
+            append_end(end)
+            if append_reach is not None:
+                # The character at stop was read too, or the end of the input.
+                reach = max(reach, stop + 1)
+                append_reach(reach)
+
+            position = end
+
+        if lines:
+            tokens.lines.extend(map(partial(bisect_left, tokens.line_index.offsets), tokens.starts))
+
+        if lex_stats is not None:
+            tokens.stats = lex_stats
+            self.report_lex(lex_stats, started)
+
+        return tokens
+
+    def start_lex(self) -> tuple[float, int, int]:
+        # The time and the lazy DFA counters when a run with stats starts.
+        return time.perf_counter(), getattr(self.table, 'states_built', 0), getattr(self.table, 'generation', 0)
+
+    def report_lex(self, lex_stats: LexStats, started: tuple[float, int, int]) -> None:
+        # Ends the stats of a run started by start_lex and hands them on.
+        start_time, states_built, generation = started
+        lex_stats.finish(time.perf_counter() - start_time)
+        lex_stats.states_built = getattr(self.table, 'states_built', 0) - states_built
+        lex_stats.flushes = getattr(self.table, 'generation', 0) - generation
+        self.lex_stats = lex_stats
+        if self.on_stats is not None:
+            self.on_stats(lex_stats)
+
+    def relex(self, tokens: TokenStream, offset: int, deleted: int, inserted: str,
+              word: str) -> tuple[TokenStream, tuple[int, int, int]]:
+        # Updates the tokens of an incremental stream in place after an edit
+        # replacing deleted characters at offset with inserted, word being the
+        # edited input. Returns the stream and (first, old_end, new_end): the
+        # tokens [first, old_end) of the old stream became [first, new_end).
+        # Lexing starts at the first token whose scan read the edited part and
+        # stops once a token ends on the start of an old token after the edit:
+        # every token starts in q0, from there the old tokens are still right.
+        # The tokens after the edit are only moved lazily (see GapColumn), the
+        # cost of an edit does not depend on the size of the input.
+        if self.utf8:
+            raise TypeError('a UTF-8 lexer reads bytes, use tokenize or lex_file')
+        if tokens.reaches is None:
+            raise ValueError('the tokens were not lexed with incremental=True')
+
+        delta = len(inserted) - deleted
+        # Reaches are increasing, the tokens before first did not read the edited part.
+        first = bisect_right(tokens.reaches, offset)
+        if first < len(tokens):
+            position = tokens.starts[first]
+        else:
+            position = tokens.ends[-1] if tokens else 0
+        # Where the old input failed to lex, if it did.
+        error_position = (tokens.ends[-1] if tokens else 0) if tokens.error is not None else None
+
+        # The line of the first token lexed, counted from the last token kept when there is no token after.
+        line_number = 0
+        if tokens.lines is not None:
+            if first < len(tokens):
+                line_number = tokens.lines[first]
+            elif tokens:
+                line_number = tokens.lines[-1] + word.count('\n', tokens.starts[-1], position)
+
+        tokens.source = word
+        if tokens.newline_index is not None:
+            tokens.newline_index.edit(offset, deleted, inserted)
+
+        token_ids, starts, ends, lines, reaches = [], [], [], [], []
+        reach = tokens.reaches[first - 1] if first > 0 else 0
+        old_end = len(tokens)
+        # Where the edited input fails to lex, if it does.
+        error = None
+        while position < len(word):
+            token_index, end, stop = self.longest_match(word, position)
+            if token_index is None:
+                error = position
+                break
+
+            reach = max(reach, stop + 1)
+            token_ids.append(token_index)
+            starts.append(position)
+            ends.append(end)
+            lines.append(line_number)
+            reaches.append(reach)
+            if tokens.lines is not None:
+                line_number += word.count('\n', position, end)
+            position = end
+
+            if position >= offset + len(inserted):
+                old_position = position - delta
+                index = bisect_left(tokens.starts, old_position, first)
+                if index < len(tokens) and tokens.starts[index] == old_position:
+                    old_end = index
+                    if error_position is not None:
+                        error = error_position + delta
+                    break
+                if old_position == error_position:
+                    # The old input failed right there, the new one fails the same way.
+                    error = position
+                    break
+
+        line_delta = 0
+        if tokens.lines is not None and old_end < len(tokens):
+            line_delta = line_number - tokens.lines[old_end]
+        tokens.replace(first, old_end, token_ids, starts, ends, lines, reaches, delta, line_delta)
+        tokens.error = self.error_after(tokens, error) if error is not None else None
+
+        return tokens, (first, old_end, first + len(token_ids))
+
+    def lex_parallel(self, word: str, workers: int | None = None,
+                     linear: bool = False) -> list[tuple[str, str]] | None:
+        return self.tokenize_parallel(word, workers, linear).to_list()
+
+    def tokenize_parallel(self, word: str, workers: int | None = None, linear: bool = False,
+                          lines: bool = False) -> TokenStream:
+        # Splits the input in one chunk per worker process and lexes every chunk
+        # as if a token started at its beginning. Every token starts in q0, so
+        # once the tokens of the previous chunks end on a token start of the
+        # chunk, the rest of its tokens are the ones lex finds too. Until then
+        # the tokens are lexed again here. The tokens are the same as tokenize's.
+        # A lazy lexer has no table to send, it lexes sequentially.
+        if self.utf8:
+            raise TypeError('a UTF-8 lexer reads bytes, use tokenize or lex_file')
+        workers = workers or os.cpu_count() or 1
+        if (workers <= 1 or len(word) < workers * self.min_parallel_chunk
+                or isinstance(self.table, LazyDFA)):
+            return self.tokenize(word, linear, lines)
+
+        bounds = self.chunk_bounds(word, workers)
+        tokens = TokenStream([token_name for token_name, _ in self.spec], word, with_lines=lines)
+        failed = set() if linear else None
         line_number = 0
-        char_index = 1
-        initial_word_size = len(word)
-
-        while word:
-            for i in range(0, len(word) + 1):
-                # Looking for all the tokens that match the current word.
-                for token_name, dfa in self.dfa_spec.items():
-                    # We do that for each prefix of the current word
-                    # (increasing the prefix size each time by one)
-                    if dfa.accept(word[:i]):
-                        matches.append((token_name, word[:i]))
-
-
-            if not matches:
-                # We do this because we start counting from 1
-                # and when the first char is not in the spec
-                # it is supposed that it failed at the previous char.
-                if not self.check_char_in_spec(word[0]):
-                    char_index -= 1
-
-                # Reached EOF without accepting any token.
-                # (example: token: "(bc)+", words that end
-                # with b reached EOF without accepting any token)
-                if char_index >= initial_word_size:
-                    char_index = -1 # Meaning EOF.
-                return self.err_message(char_index, line_number)
-
-            longest_match = self.get_longest_match(matches)
-            result.append(longest_match)
-
-            # Removing the longest match from the current word.
-            word = word[len(longest_match[1]):]
-
-            # Updating the line number and the char index.
-            char_index += len(longest_match[1])
-            nr_of_newlines = longest_match[1].count('\n')
-            if nr_of_newlines > 0:
-                line_number += nr_of_newlines
-                # When we encounter a newline we reset the char index.
-                initial_word_size -= char_index
-                char_index = 1
-
-            matches = []
-
-        return result
+        position = 0
+
+        # The compiled table is sent to every worker once, and every chunk
+        # of the input to the worker lexing it.
+        texts = (word[start:end + self.chunk_overlap] for start, end in zip(bounds, bounds[1:]))
+        at_ends = (end + self.chunk_overlap >= len(word) for end in bounds[1:])
+        with self.process_pool(workers) as executor:
+            chunks = executor.map(lex_chunk, texts, bounds[:-1], bounds[1:], at_ends,
+                                  repeat(linear), repeat(lines))
+
+            for start, end, (chunk, error) in zip(bounds, bounds[1:], chunks):
+                while position < end:
+                    index = bisect_left(chunk.starts, position)
+                    if index < len(chunk) and chunk.starts[index] == position:
+                        # In sync with the chunk, taking the rest of its tokens.
+                        tokens.token_ids.extend(chunk.token_ids[index:])
+                        tokens.starts.extend(chunk.starts[index:])
+                        tokens.ends.extend(chunk.ends[index:])
+                        if lines:
+                            offset = line_number - chunk.lines[index]
+                            tokens.lines.extend(line + offset for line in chunk.lines[index:])
+                            line_number += word.count('\n', position, chunk.ends[-1])
+                        position = chunk.ends[-1]
+                        continue
+
+                    if position != error:
+                        token_index, token_end, _ = self.longest_match(word, position, failed)
+                        if token_index is not None:
+                            tokens.append(token_index, position, token_end, line_number)
+                            if lines:
+                                line_number += word.count('\n', position, token_end)
+                            position = token_end
+                            continue
+
+                    tokens.error = self.error_after(tokens, position)
+                    return tokens
+
+        return tokens
+
+    def lex_many(self, words: Iterable[str], executor: Executor | None = None, ordered: bool = True,
+                 batch_size: int = 64, linear: bool = False) -> Iterator:
+        # Lexes every word of words, yielding the results of lex in the same
+        # order, or as (index of the word, result) pairs as soon as they are
+        # done when ordered is False. The words are sent to the executor (a
+        # thread or process pool) in batches along with the lexer, which a
+        # process only loads once, or without it to a pool of process_pool,
+        # whose workers got it when they started. Without executor they are
+        # lexed in place. The threads of a thread pool lex with their own
+        # copies of a lazy lexer.
+        if executor is None:
+            for index, word in enumerate(words):
+                tokens = self.lex(word, linear)
+                yield tokens if ordered else (index, tokens)
+            return
+
+        # The index of the first word of every batch submitted and not yielded yet.
+        pending = {}
+        next_index = 0
+        batches = batched(words, batch_size)
+        lexer = None if pool_lexers.get(executor) is self else self
+
+        while True:
+            batch = next(batches, None)
+            if batch is not None:
+                pending[executor.submit(lex_batch, lexer, batch, linear)] = next_index
+                next_index += len(batch)
+                if len(pending) < self.max_pending_batches:
+                    continue
+            if not pending:
+                return
+
+            if ordered:
+                future = next(iter(pending))
+            else:
+                future = next(iter(wait(pending, return_when=FIRST_COMPLETED).done))
+            first_index = pending.pop(future)
+            results = future.result()
+            yield from results if ordered else enumerate(results, first_index)
+
+    def chunk_bounds(self, word: str, nr_chunks: int) -> list[int]:
+        # Chunks start after a newline when there is one close by, the tokens
+        # lexed from there are more likely to be the ones lex finds.
+        bounds = [0]
+        for chunk in range(1, nr_chunks):
+            bound = len(word) * chunk // nr_chunks
+            newline = word.find('\n', bound, bound + self.min_parallel_chunk // 2)
+            bounds.append(max(newline + 1 if newline >= 0 else bound, bounds[-1]))
+        bounds.append(len(word))
+
+        return bounds
+
+    def error_after(self, tokens: TokenStream, position: int) -> list[tuple[str, str]]:
+        # The error message of lex, when the tokens end at position and no
+        # token starts there. The line is the number of newlines before
+        # position, and every token containing newlines (a reset) restarts
+        # the char index: it counts from the end of the last one. The resets
+        # only decide whether the error is at EOF, which takes as many resets
+        # as characters left after position: with fewer newlines there is no
+        # need to count them, else they are counted backwards up to that many,
+        # through the newline index.
+        word = tokens.source
+        newlines = tokens.line_index.offsets
+        line_number = bisect_left(newlines, position)
+        char = word[position] if isinstance(word, str) else chr(word[position])
+        char_index = 1 + position
+
+        if line_number:
+            last_reset = tokens.ends[bisect_right(tokens.starts, newlines[line_number - 1]) - 1]
+            char_index -= last_reset
+            resets_to_eof = len(word) - position - 1 + (not self.check_char_in_spec(char))
+            nr_resets = 0
+            newline = line_number - 1 if line_number >= resets_to_eof else -1
+            while newline >= 0 and nr_resets < resets_to_eof:
+                nr_resets += 1
+                token = bisect_right(tokens.starts, newlines[newline]) - 1
+                newline = bisect_left(newlines, tokens.starts[token], 0, newline) - 1
+            return self.error_at(char, char_index, line_number, len(word) - nr_resets - last_reset)
+
+        return self.error_at(char, char_index, line_number, len(word))
+
+    def lex_stream(self, fp: TextIO, chunk_size: int = 1 << 16) -> Iterator[tuple[str, str]]:
+        # Yields the tokens of a text file as soon as they are complete, read
+        # with scan_chunks. On error the tokens already yielded stay valid and
+        # the error message is yielded last.
+        if self.utf8:
+            raise TypeError('a UTF-8 lexer reads bytes, use tokenize or lex_file')
+        scanner = self.scan_chunks('', NewlineIndex(), chunk_size)
+        tokens, read_size = next(scanner)
+        while True:
+            for token_name, lexeme, _, _ in tokens:
+                yield token_name, lexeme
+            if not read_size:
+                return
+            tokens, read_size = scanner.send(fp.read(read_size))
+
+    async def alex(self, reader: asyncio.StreamReader, chunk_size: int = 1 << 16) -> AsyncIterator[Token]:
+        # Yields the tokens of the data of reader as soon as they are complete,
+        # like lex_stream. The data is lexed as bytes, the way tokenize lexes
+        # bytes, and offsets are in bytes. The event loop gets control back
+        # before every chunk read, even when the data is already there. On
+        # error the tokens already yielded stay valid, and a token named ''
+        # holding the error message is yielded last.
+        newline_index = NewlineIndex(b'')
+        scanner = self.scan_chunks(b'', newline_index, chunk_size)
+        tokens, read_size = next(scanner)
+        while True:
+            for token in tokens:
+                yield Token(*token, newline_index)
+            if not read_size:
+                return
+            await asyncio.sleep(0)
+            tokens, read_size = scanner.send(await reader.read(read_size))
+
+    def scan_chunks(self, empty: str | bytes, newline_index: NewlineIndex,
+                    chunk_size: int) -> Generator[tuple[list[tuple[str, str, int, int]], int], str | bytes, None]:
+        # Lexes an input read in chunks by the caller (lex_stream, alex): yields
+        # the (name, lexeme, start, end) tokens completed so far and the size of
+        # the next chunk to read, which is sent back (empty at the end of the
+        # input); the size is 0 once the input is lexed. The chunks are all of
+        # the type of empty, str or bytes. Only the input from the start of the
+        # pending token is kept, and newline_index, extended with every chunk,
+        # which gives the lines of the tokens and of the error. An error is a
+        # token named '' holding the error message, yielded last.
+        buffer = empty
+        classes = None if isinstance(buffer, str) else [self.table.classes[chr(byte)] for byte in range(256)]
+        names = [token_name for token_name, _ in self.spec]
+        encoding = 'utf-8' if self.utf8 else 'latin-1'
+        newlines = newline_index.offsets
+        position = 0
+        at_eof = False
+        # Size of the input dropped from the buffer so far.
+        consumed = 0
+
+        # The tokens containing newlines (resets) of error_after, found as the
+        # tokens ending past the first newline after the last one.
+        nr_resets = 0
+        last_reset = 0
+        next_newline = 0
+
+        # The size of the stats is the size of the input read.
+        lex_stats = LexStats(names) if self.stats else None
+        if lex_stats is not None:
+            started = self.start_lex()
+
+        tokens = []
+        while True:
+            if position < len(buffer):
+                token_index, end, stop = self.longest_match(buffer, position, None, classes)
+                # The scan stops at the end of the buffer only when the token
+                # might go on in the input not read yet.
+                complete = stop < len(buffer) or at_eof
+            else:
+                if at_eof:
+                    if lex_stats is not None:
+                        lex_stats.size = consumed + len(buffer)
+                        self.report_lex(lex_stats, started)
+                    yield tokens, 0
+                    return
+                complete = False
+
+            if not complete:
+                # Reading at least as much as is pending, so a long token is
+                # rescanned a logarithmic number of times.
+                chunk = yield tokens, max(chunk_size, len(buffer) - position)
+                tokens = []
+                if not chunk:
+                    at_eof = True
+                else:
+                    newline_index.extend(chunk)
+                    consumed += position
+                    buffer = buffer[position:] + chunk
+                    position = 0
+                continue
+
+            start = consumed + position
+            if token_index is None:
+                # error_at only needs the size of the input to tell whether the
+                # error is at EOF, which takes no more than nr_resets characters
+                # after it (the bound of error_after): the input is read up to
+                # one character past that, not to its end.
+                input_size = consumed + len(buffer)
+                bound = start + 1 + nr_resets
+                if input_size <= bound:
+                    chunk = yield tokens, bound + 1 - input_size
+                    tokens = []
+                    while chunk:
+                        input_size += len(chunk)
+                        if input_size > bound:
+                            break
+                        chunk = yield [], bound + 1 - input_size
+                char = buffer[position] if isinstance(buffer, str) else chr(buffer[position])
+                [(_, message)] = self.error_at(char, 1 + start - last_reset, newline_index.line_of(start),
+                                              input_size - nr_resets - last_reset)
+                if lex_stats is not None:
+                    lex_stats.size = input_size
+                    lex_stats.record_failure(start, consumed + stop)
+                    self.report_lex(lex_stats, started)
+                yield tokens + [('', message, start, start)], 0
+                return
+
+            if lex_stats is not None:
+                lex_stats.record(token_index, start, consumed + end, consumed + stop)
+            lexeme = buffer[position:end]
+            tokens.append((names[token_index], lexeme if isinstance(lexeme, str) else lexeme.decode(encoding),
+                           start, consumed + end))
+            if next_newline < len(newlines) and newlines[next_newline] < consumed + end:
+                nr_resets += 1
+                last_reset = consumed + end
+                next_newline = bisect_left(newlines, last_reset, next_newline)
+            position = end
+
+    def lex_file(self, path: str) -> TokenStream:
+        # The file is memory mapped and lexed as bytes, the tokens are offsets
+        # into it and nothing is decoded until a lexeme is asked for.
+        with open(path, 'rb') as file:
+            # An empty file cannot be memory mapped.
+            if os.fstat(file.fileno()).st_size:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = b''
+
+        return self.tokenize(data)
+
+    def error_at(self, char: str, char_index: int, line_number: int,
+                 initial_word_size: int) -> list[tuple[str, str]]:
+        # We do this because we start counting from 1
+        # and when the first char is not in the spec
+        # it is supposed that it failed at the previous char.
+        if not self.check_char_in_spec(char):
+            char_index -= 1
+
+        # Reached EOF without accepting any token.
+        # (example: token: "(bc)+", words that end
+        # with b reached EOF without accepting any token)
+        if char_index >= initial_word_size:
+            char_index = -1 # Meaning EOF.
+        return self.err_message(char_index, line_number)
+
+    def longest_match(self, word: str | bytes, start: int,
+                      failed: set[tuple[int, int]] | None = None,
+                      classes: Sequence[int] | None = None) -> tuple[int | None, int, int]:
+        # Returns the token index and end of the longest token starting at start,
+        # and the position where the scan stopped (len(word) when it ran out of input).
+        # Bytes are looked up in the classes given, indexed by byte value.
+        table = self.table
+        transitions, labels = table.d, table.labels
+        if classes is None:
+            classes = table.classes
+        width = table.nr_classes
+        state = table.q0
+        # (token index, end position) of the longest token seen so far.
+        match = (None, start)
+        # The pairs walked through since the last final state.
+        since_match = []
+        generation = getattr(table, 'generation', 0)
+
+        if state == DEAD:
+            return *match, start
+
+        # Walking the DFA until it gets stuck, remembering the last final state.
+        for index in range(start, len(word)):
+            if failed is not None:
+                if (state, index) in failed:
+                    break
+                since_match.append((state, index))
+
+            symbol_class = classes[word[index]]
+            if symbol_class < 0:
+                break
+            next_state = transitions[state * width + symbol_class]
+            if next_state < 0:
+                if next_state == DEAD:
+                    break
+
+                # Only a lazy DFA has transitions that were not built yet.
+                next_state = table.step(state, symbol_class)
+                if table.generation != generation:
+                    # Its cache was flushed, the states remembered so far mean something else now.
+                    generation = table.generation
+                    if failed is not None:
+                        failed.clear()
+                        since_match = []
+                if next_state == DEAD:
+                    break
+            state = next_state
+
+            token_index = labels[state]
+            if token_index >= 0:
+                match = (token_index, index + 1)
+                since_match = []
+        else:
+            index = len(word)
+
+        # None of the pairs walked after the last final state lead to a token.
+        if failed is not None:
+            failed.update(since_match)
+
+        return *match, index
 
     def err_message(self, char_index, line_nr):
         displayed_char_index_str = str(char_index)
@@ -81,11 +919,3 @@ class Lexer:
         
     def check_char_in_spec(self, char: str) -> bool:
         return any(char in regex for (_, regex) in self.spec)
-
-    def get_longest_match(self, matches: list[tuple[str, str]]) -> tuple[str, str]:
-        longest_match = matches[0]
-        for match in matches:
-            if len(match[1]) > len(longest_match[1]):
-                longest_match = match
-
-        return longest_match
@@ -1,3 +1,4 @@
+from .Alphabet import Alphabet
 from .DFA import DFA
 
 from dataclasses import dataclass
@@ -14,59 +15,63 @@ class NFA[STATE]:
     q0: STATE
     d: dict[tuple[STATE, str], set[STATE]]
     F: set[STATE]
-
-    def compute_epsilon_closure(self, state: STATE,
-                                 epsilon_closure_result: set[STATE],
-                                   visited_states: set[STATE]) -> None:
-        visited_states.add(state)
-        epsilon_closure_result.add(state)
-
-        # Those are the states reachable from the current state on epsilon transitions.
-        epsilon_transition_states = self.d.get((state, EPSILON), set())
-
-        # Getting epsilon closure of each state reachable
-        #from the current state on epsilon transitions.
-        unvisited_states = [s for s in epsilon_transition_states if s not in visited_states]
-        for s in unvisited_states:
-            self.compute_epsilon_closure(s, epsilon_closure_result, visited_states)
+    # The alphabet whose classes the symbols stand for, None when they are characters.
+    alphabet: Alphabet | None = None
 
     def epsilon_closure(self, state: STATE) -> set[STATE]:
-        epsilon_closure_result = set()
-        visited_states = set()
+        epsilon_closure_result = {state}
+        # Iterative depth first search, long epsilon chains don't hit the recursion limit.
+        stack = [state]
 
-        self.compute_epsilon_closure(state, epsilon_closure_result, visited_states)
+        while stack:
+            current_state = stack.pop()
+            for next_state in self.d.get((current_state, EPSILON), ()):
+                if next_state not in epsilon_closure_result:
+                    epsilon_closure_result.add(next_state)
+                    stack.append(next_state)
 
         return epsilon_closure_result
-    
-
-    def compute_next_states_epsilon_closure(self, current_state, symbol):
-        # Get all the states that can be reached from the current state on the given symbol.
-        next_states = set().union(*(self.d.get((state, symbol), set()) for state in current_state))
-        # Compute the epsilon closure of all the states
-        # that can be reached from the current state on the given symbol.
-        # * is used to unpack the set of sets into a single set (iterable).
-        # Union is used to merge all the sets into a single set(with no duplicates).
-        next_states_epsilon_closure = set().union(*(self.epsilon_closure(state)
-                                                     for state in next_states))
-
-        return next_states_epsilon_closure
-
-    def add_new_state_to_dfa(self, new_state, dfa_states, queue):
-        if new_state not in dfa_states:
-            dfa_states.add(new_state)
-            queue.append(new_state)
-
-    def process_symbol_transition(self, current_state, symbol, dfa_states, queue, dfa_transitions):
-        next_states_epsilon_closure = self.compute_next_states_epsilon_closure(current_state,
-                                                                                symbol)
 
-        new_state = frozenset(next_states_epsilon_closure)
-        self.add_new_state_to_dfa(new_state, dfa_states, queue)
-
-        dfa_transitions[(current_state, symbol)] = new_state
+    def epsilon_closures(self) -> dict[STATE, frozenset[STATE]]:
+        epsilon_transitions = {state: next_states for (state, symbol), next_states in self.d.items()
+                                if symbol == EPSILON}
+        closures = {}
+
+        for state in self.K:
+            closure = {state}
+            stack = [state]
+            while stack:
+                current_state = stack.pop()
+                for next_state in epsilon_transitions.get(current_state, ()):
+                    if next_state in closure:
+                        continue
+                    # A closure computed before already holds everything reachable from there.
+                    if next_state in closures:
+                        closure |= closures[next_state]
+                    else:
+                        closure.add(next_state)
+                        stack.append(next_state)
+
+            closures[state] = frozenset(closure)
+
+        return closures
+
+    def outgoing_transitions(self) -> dict[STATE, dict[str, set[STATE]]]:
+        # For each state, the states reachable on each of its (non epsilon) symbols.
+        outgoing = {state: {} for state in self.K}
+        for (state, symbol), next_states in self.d.items():
+            if symbol != EPSILON:
+                outgoing.setdefault(state, {}).setdefault(symbol, set()).update(next_states)
+
+        return outgoing
 
     def subset_construction(self) -> 'DFA':
-        start_state = frozenset(self.epsilon_closure(self.q0))
+        # Both are computed once, every DFA state is then built from them
+        # without looking at the whole transition function again.
+        closures = self.epsilon_closures()
+        outgoing = self.outgoing_transitions()
+
+        start_state = closures[self.q0]
         dfa_states = {start_state}
         dfa_transitions = {}
         dfa_final_states = set()
@@ -78,21 +83,25 @@ class NFA[STATE]:
             current_state = queue.popleft()
 
             # Check if the current state is a final state.
-            for state in self.F:
-                if state in current_state:
-                    dfa_final_states.add(current_state)
-                    break
-
-            # Get all the symbols that can be used to transition from the current state
-            symbols = {symbol for state, symbol in self.d.keys() if state in current_state}
-            symbols.discard(EPSILON) # Remove '' from the set of symbols. Not needed for now.
-
-            # Perform the transition for each symbol that can be
-            # used to transition from the current state.
-            for symbol in symbols:
-                self.process_symbol_transition(current_state, symbol,
-                                                dfa_states, queue, dfa_transitions)
-                
+            if not self.F.isdisjoint(current_state):
+                dfa_final_states.add(current_state)
+
+            # The NFA states reachable on each symbol that can be used to
+            # transition from the current state.
+            next_states_by_symbol = {}
+            for state in current_state:
+                for symbol, next_states in outgoing[state].items():
+                    next_states_by_symbol.setdefault(symbol, set()).update(next_states)
+
+            for symbol, next_states in next_states_by_symbol.items():
+                # The DFA state is the epsilon closure of all those states.
+                new_state = frozenset().union(*(closures[state] for state in next_states))
+                if new_state not in dfa_states:
+                    dfa_states.add(new_state)
+                    queue.append(new_state)
+
+                dfa_transitions[(current_state, symbol)] = new_state
+
         # Add the epsilon transition back to the DFA.
         dfa_states.add(frozenset(EPSILON))
 
@@ -102,7 +111,7 @@ class NFA[STATE]:
                 if (state, symbol) not in dfa_transitions:
                     dfa_transitions[(state, symbol)] = frozenset(EPSILON)
 
-        return DFA(self.S, dfa_states, start_state, dfa_transitions, dfa_final_states)
+        return DFA(self.S, dfa_states, start_state, dfa_transitions, dfa_final_states, self.alphabet)
 
     def remap_states[OTHER_STATE](self, f: Callable[[STATE], OTHER_STATE]) -> 'NFA[OTHER_STATE]':
         new_states = {state: f(state) for state in self.K}
@@ -116,4 +125,5 @@ class NFA[STATE]:
                 K=set(new_states.values()),
                 q0=new_q0,
                 d=new_d,
-                F=new_F)
\ No newline at end of file
+                F=new_F,
+                alphabet=self.alphabet)
\ No newline at end of file
@@ -0,0 +1,66 @@
+from array import array
+from bisect import bisect_left
+import mmap
+
+from .GapColumn import GapColumn
+
+type Source = str | bytes | mmap.mmap
+
+
+class NewlineIndex:
+    # The offsets of the newlines of a source, found by one scan of the whole
+    # source (find runs in C). The line and column of any offset are then
+    # found by bisection, only for the offsets asked for. Lines and columns
+    # count from 0, in characters or in bytes, like the offsets of the source.
+    # A source arriving in parts is indexed part by part with extend, an
+    # edited one is updated with edit.
+    def __init__(self, source: Source = '') -> None:
+        self.offsets = array('q')
+        # The size of the source indexed so far.
+        self.size = 0
+        self.extend(source)
+
+    def extend(self, data: Source) -> None:
+        # Indexes data as the continuation of the source indexed so far.
+        newline = '\n' if isinstance(data, str) else b'\n'
+        offsets, size = self.offsets, self.size
+
+        index = data.find(newline)
+        while index >= 0:
+            offsets.append(size + index)
+            index = data.find(newline, index + 1)
+        self.size += len(data)
+
+    def edit(self, offset: int, deleted: int, inserted: Source) -> None:
+        # Updates the index after deleted characters at offset were replaced
+        # with inserted. The offsets become a gap column: only the newlines
+        # between this edit and the previous one are moved.
+        if not isinstance(self.offsets, GapColumn):
+            self.offsets = GapColumn(self.offsets)
+
+        newline = '\n' if isinstance(inserted, str) else b'\n'
+        new_offsets = []
+        index = inserted.find(newline)
+        while index >= 0:
+            new_offsets.append(offset + index)
+            index = inserted.find(newline, index + 1)
+
+        first = bisect_left(self.offsets, offset)
+        last = bisect_left(self.offsets, offset + deleted, first)
+        self.offsets.replace(first, last, new_offsets, len(inserted) - deleted)
+        self.size += len(inserted) - deleted
+
+    def __len__(self) -> int:
+        # The number of lines, the one after the last newline included.
+        return len(self.offsets) + 1
+
+    def line_of(self, offset: int) -> int:
+        # The newlines before offset.
+        return bisect_left(self.offsets, offset)
+
+    def line_start(self, line: int) -> int:
+        return self.offsets[line - 1] + 1 if line > 0 else 0
+
+    def position(self, offset: int) -> tuple[int, int]:
+        line = self.line_of(offset)
+        return line, offset - self.line_start(line)
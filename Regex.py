@@ -1,9 +1,105 @@
-from .NFA import NFA
+from collections.abc import Iterator
+from functools import cache
+import inspect
+import weakref
+
+from .Alphabet import Alphabet, CharSet, char_set_complement, char_set_of, char_set_union, chars_of
+from .LRUCache import LRUCache
+from .NFA import NFA, EPSILON
+
+# The (initial state, final state) pair of the part of an NFA built for a regex.
+type Fragment = tuple[int, int]
+
+class ThompsonBuilder:
+    # Builds NFAs for regexes with the Thompson construction. All of them go into
+    # the same transition function, with state ids taken from one counter, so
+    # nothing gets copied or remapped and the construction is linear in the
+    # size of the regexes.
+    def __init__(self, alphabet: Alphabet | None = None):
+        self.alphabet = alphabet
+        self.nr_states = 0
+        self.S = set()
+        self.d = {}
+
+    def new_state(self) -> int:
+        self.nr_states += 1
+        return self.nr_states - 1
+
+    def add_transition(self, state: int, symbol: str, next_state: int) -> None:
+        self.d.setdefault((state, symbol), set()).add(next_state)
+
+    def build(self, regex: 'Regex') -> Fragment:
+        # Post-order walk without recursion, the children fragments of a node
+        # are on top of the fragments stack when the node is built.
+        fragments = []
+        stack = [(regex, False)]
+
+        while stack:
+            node, children_built = stack.pop()
+            if children_built:
+                nr_children = len(node.children)
+                children_fragments = fragments[len(fragments) - nr_children:]
+                del fragments[len(fragments) - nr_children:]
+                fragments.append(node.fragment(self, *children_fragments))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+
+        return fragments[0]
+
+    def nfa(self, initial_state: int, final_states: set[int]) -> NFA[int]:
+        return NFA(self.S, set(range(self.nr_states)), initial_state, self.d, final_states, self.alphabet)
+
+# Every regex node alive, by class and constructor arguments. Nodes are hash
+# consed: building a node equal to an existing one gives back that node, so
+# equal regexes (and the sub-expressions they share) are the same objects.
+nodes = weakref.WeakValueDictionary()
+
+# The regexes parsed lately, by regex string.
+parsed_regexes = LRUCache(1024)
+
+# The parameters of the nodes of a class, to build their keys from.
+@cache
+def init_signature(cls: type) -> inspect.Signature:
+    return inspect.signature(cls.__init__)
 
 class Regex:
-    def thompson(self) -> NFA[int]:
+    children: tuple['Regex', ...] = ()
+
+    def __new__(cls, *args, **kwargs):
+        # The children are hash consed too, their identity is their structure.
+        # The arguments are bound to the parameters of __init__, defaults
+        # included, so the key does not depend on how they were passed.
+        signature = init_signature(cls)
+        if kwargs or len(args) != len(signature.parameters) - 1:
+            bound = signature.bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            args = bound.args[1:]
+        key = (cls, *args)
+        node = nodes.get(key)
+        if node is None:
+            node = super().__new__(cls)
+            node.args = args
+            nodes[key] = node
+        return node
+
+    def __getnewargs__(self) -> tuple:
+        # Unpickled and copied nodes are hash consed as well.
+        return self.args
+
+    def thompson(self, alphabet: Alphabet | None = None) -> NFA[int]:
+        # Without an alphabet the NFA runs over the classes of the character
+        # sets of the regex: a negated class like [^a] is one class instead
+        # of every character but a.
+        if alphabet is None:
+            alphabet = Alphabet(character_sets(self))
+        builder = ThompsonBuilder(alphabet)
+        initial_state, final_state = builder.build(self)
+        return builder.nfa(initial_state, {final_state})
+
+    def fragment(self, builder: ThompsonBuilder, *children: Fragment) -> Fragment:
         raise NotImplementedError(
-            'the thompson method of the Regex class should never be called')
+            'the fragment method of the Regex class should never be called')
 
 class Character(Regex):
     __match_args__ = ("chr",)
@@ -11,35 +107,54 @@ class Character(Regex):
     def __init__(self, character: str):
         self.chr = character
         self.symbols = set(character)
-
-    def thompson(self) -> NFA[int]:
-        # Thompson construction for characters or character ranges
-        transitions = {(0, symbol): {1} for symbol in self.symbols}
-        nfa = NFA(self.symbols, {0, 1}, 0, transitions, {1})
-        return nfa
-
-class Operator(Regex):
-    __match_args__ = ("op",)
-
-    def __init__(self, op: str, regex1: Regex = None, regex2: Regex = None):
-        self.op = op
-        self.regex1 = regex1
-        self.regex2 = regex2
-
-    def thompson(self) -> NFA[int]:
-        raise NotImplementedError(
-            'the thompson method of the Operator class should never be called')
-
-    @staticmethod
-    def priority(op: str) -> int:
-        # Use a set for comparison
-        if op in {'*', '+', '?'}:
-            return 3
-        elif op == "~":  # Concatenation. Used tilde instead of dot because dot appears in regexes.
-            return 2
-        elif op == "|":
-            return 1
-        return 0
+        self.char_set = char_set_of(character)
+
+    def fragment(self, builder: ThompsonBuilder) -> Fragment:
+        # Thompson construction for characters or character ranges.
+        # Over an alphabet, the transitions use the symbols of its classes,
+        # and a character may take several steps (e.g. its UTF-8 bytes).
+        if builder.alphabet is None:
+            sequences = [(self.symbols,)]
+        else:
+            sequences = builder.alphabet.sequences(self.char_set)
+
+        initial_state, final_state = builder.new_state(), builder.new_state()
+        for sequence in sequences:
+            state = initial_state
+            for step, symbols in enumerate(sequence, 1):
+                next_state = final_state if step == len(sequence) else builder.new_state()
+                for symbol in symbols:
+                    builder.add_transition(state, symbol, next_state)
+                builder.S.update(symbols)
+                state = next_state
+
+        return initial_state, final_state
+
+class CharacterRange(Character):
+    __match_args__ = ("first", "last")
+
+    def __init__(self, first: str, last: str):
+        self.first = first
+        self.last = last
+        self.chr = f"[{first}-{last}]"
+        # Kept as an interval, the characters are only listed when there is no alphabet.
+        self.char_set = ((ord(first), ord(last)),) if first <= last else ()
+
+    @property
+    def symbols(self) -> set[str]:
+        return chars_of(self.char_set)
+
+class CharacterClass(Character):
+    __match_args__ = ("char_set",)
+
+    def __init__(self, char_set: CharSet):
+        self.char_set = char_set
+        self.chr = "[" + "".join(chr(first) if first == last else f"{chr(first)}-{chr(last)}"
+                                 for first, last in char_set) + "]"
+
+    @property
+    def symbols(self) -> set[str]:
+        return chars_of(self.char_set)
 
 class Concat(Regex):
     __match_args__ = ("regex1", "regex2")
@@ -47,30 +162,13 @@ class Concat(Regex):
     def __init__(self, regex1: Regex, regex2: Regex):
         self.regex1 = regex1
         self.regex2 = regex2
+        self.children = (regex1, regex2)
 
-    def thompson(self) -> NFA[int]:
-        nfa1 = self.regex1.thompson()
-        nfa2 = self.regex2.thompson()
-
-        # Remaping states for the second nfa in order to avoid conflicts.
-        nfa2 = nfa2.remap_states(lambda x: x + max(nfa1.K) + 1)
-
-        # Merge the NFAs by adding epsilon transitions from final
-        # states of regex1 to the initial state of regex2.
-        for state in nfa1.F:
-            nfa1.d[(state, '')] = {nfa2.q0} | nfa1.d.get((state, ''), set())
+    def fragment(self, builder: ThompsonBuilder, fragment1: Fragment, fragment2: Fragment) -> Fragment:
+        # Linking the final state of regex1 to the initial state of regex2.
+        builder.add_transition(fragment1[1], EPSILON, fragment2[0])
 
-        # Update final states.
-        nfa1.F = nfa2.F
-
-        # Merge states and transitions.
-        nfa1.K.update(nfa2.K)
-        nfa1.d.update(nfa2.d)
-
-        # Add states to the alphabet.
-        nfa1.S.update(nfa2.S)
-
-        return nfa1
+        return fragment1[0], fragment2[1]
 
 class Union(Regex):
     __match_args__ = ("regex1", "regex2")
@@ -78,62 +176,35 @@ class Union(Regex):
     def __init__(self, regex1: Regex, regex2: Regex):
         self.regex1 = regex1
         self.regex2 = regex2
-    def thompson(self) -> NFA[int]:
-        nfa1 = self.regex1.thompson()
-        nfa2 = self.regex2.thompson()
-
-        new_initial_state = 0
-
-        # Remap states of the nfas in order to avoid conflicts.
-        nfa1 = nfa1.remap_states(lambda x: x + 1)
-        remap_value_nfa2 = max(nfa1.K) + 1
-        nfa2 = nfa2.remap_states(lambda x: x + remap_value_nfa2)
-        
-        # Build a new nfa that represents the union of nfa1 and nfa2.
-        new_nfa = NFA(
-            nfa1.S.union(nfa2.S),
-            nfa1.K.union(nfa2.K).union({new_initial_state}),
-            new_initial_state,
-            {**nfa1.d, **nfa2.d},
-            nfa1.F.union(nfa2.F)
-        )
-
-        # Add epsilon transitions from the new initial state
-        # to the initial states of regex1 and regex2.
-        new_nfa.d[(new_initial_state, '')] = {nfa1.q0, nfa2.q0}
-
-        return new_nfa
+        self.children = (regex1, regex2)
+
+    def fragment(self, builder: ThompsonBuilder, fragment1: Fragment, fragment2: Fragment) -> Fragment:
+        initial_state, final_state = builder.new_state(), builder.new_state()
+
+        # The new initial state goes into either regex, both of them end in the new final state.
+        for fragment in (fragment1, fragment2):
+            builder.add_transition(initial_state, EPSILON, fragment[0])
+            builder.add_transition(fragment[1], EPSILON, final_state)
+
+        return initial_state, final_state
 
 class Star(Regex):
     __match_args__ = ("regex",)
 
     def __init__(self, regex: Regex):
         self.regex = regex
+        self.children = (regex,)
 
-    def thompson(self) -> NFA[int]:
-        nfa = self.regex.thompson()
-        nfa = nfa.remap_states(lambda x: x + 1)
-
-        old_initial_state = nfa.q0
-        new_initial_state = 0
-
-        nfa.K.add(new_initial_state)
-        nfa.q0 = new_initial_state
-
-        # Add epsilon transition from the final states to the old initial state.
-        for state in nfa.F:
-            nfa.d.setdefault((state, ''), set()).add(old_initial_state)
+    def fragment(self, builder: ThompsonBuilder, fragment: Fragment) -> Fragment:
+        initial_state, final_state = builder.new_state(), builder.new_state()
 
-        # Final states from the received nfa are no longer final states.
-        nfa.F = set()
-        
-        # Set the old initial state as the only final state.
-        nfa.F.add(old_initial_state)
+        # Skipping the regex entirely, or going through it any number of times.
+        builder.add_transition(initial_state, EPSILON, fragment[0])
+        builder.add_transition(initial_state, EPSILON, final_state)
+        builder.add_transition(fragment[1], EPSILON, fragment[0])
+        builder.add_transition(fragment[1], EPSILON, final_state)
 
-        # Add epsilon transition from the new initial state to the old initial state.
-        nfa.d[(new_initial_state, '')] = {old_initial_state}
-
-        return nfa
+        return initial_state, final_state
 
 
 class Plus(Regex):
@@ -141,201 +212,274 @@ class Plus(Regex):
 
     def __init__(self, regex: Regex):
         self.regex = regex
+        self.children = (regex,)
 
-    def thompson(self) -> NFA[int]:
-        # Implement Thompson construction for plus
-        nfa = self.regex.thompson()
-
-        # Add a new state for the loop
-        old_initial_state = nfa.q0
-        new_state = max(nfa.K) + 1
-        nfa.K.add(new_state)
-
-        # Add epsilon transition from the new state to the old initial state
-        nfa.d[(new_state, '')] = {old_initial_state}
-
-        # Add epsilon transition from the final states to the old initial state
-        for state in nfa.F:
-            nfa.d.setdefault((state, ''), set()).add(old_initial_state)
-
-        # Add the new state to the set of final states
-        nfa.F.add(new_state)
+    def fragment(self, builder: ThompsonBuilder, fragment: Fragment) -> Fragment:
+        # Going through the regex at least once, then looping back to its initial state.
+        builder.add_transition(fragment[1], EPSILON, fragment[0])
 
-        return nfa
+        return fragment
     
 class Question(Regex):
     __match_args__ = ("regex",)
 
     def __init__(self, regex: Regex):
         self.regex = regex
+        self.children = (regex,)
 
-    def thompson(self) -> NFA[int]:
-        nfa = self.regex.thompson()
-        # Adding the initial state to the set of final states.
-        nfa.F.add(nfa.q0)
+    def fragment(self, builder: ThompsonBuilder, fragment: Fragment) -> Fragment:
+        initial_state, final_state = builder.new_state(), builder.new_state()
 
-        return nfa
-    
-def isEscaped(regex: str, index: int) -> bool:
-    if not index:
-        return False
-    else:
-        return regex[index - 1] == '\\'
-        
-def isEscapedSpace(regex: str, index: int) -> bool:
-    if not index:
-        return False
-    else:
-        return regex[index - 1] == '\\' and regex[index] == ' '
-    
-def isEscapedOperator(regex: str, index: int) -> bool:
-    if not index:
-        return False
-    else:
-        return regex[index - 1] == '\\' and regex[index] in set("*|+?()")
-    
-# check if a character from a regex is situated inside a syntactic sugar
-def isPartOfSyntacticSugar(regex: str, index: int) -> bool:
-    if not index or len(regex) < 4:
-        return False
-    elif regex[index - 1] == '[' or \
-        regex[index - 2] == '[' or \
-        regex[index - 3] == '[' or \
-        regex[index - 4] == '[':
-
-        return True
-    
-    return False
-    
-def expand_syntactic_sugars(regex: str) -> str:
-    regex = regex.replace("[a-z]", "(a|b|c|d|e|f|g|h|i|j|k|l|m|n|o|p|q|r|s|t|u|v|w|y|z)")
-    regex = regex.replace("[A-Z]", "(A|B|C|D|E|F|G|H|I|J|K|L|M|N|O|P|Q|R|S|T|U|V|W|Y|Z)")
-    regex = regex.replace("[0-9]", "(0|1|2|3|4|5|6|7|8|9)")
-    return regex
-
-def add_concatenation_tilde(regex: list) -> str:
-    special_chars = set("\n@-._/[]\\")
-    high_priority_operators = set("*+?")
-    new_regex = ""
-
-    for i, char in enumerate(regex):
-        is_alnum_or_special = (
-            char.isalnum() or
-            char in special_chars or
-            char == '\\' or
-            char == '(' or
-            char == ":"
-        )
-        is_prev_alnum_or_special = (
-            regex[i - 1].isalnum() or
-            regex[i - 1] in special_chars or
-            regex[i - 1] in high_priority_operators or
-            regex[i - 2] == '\\' or
-            regex[i - 1] == ')'
-        )
-        not_escaped = not isEscaped(regex, i)
-        not_sugar = not isPartOfSyntacticSugar(regex, i)
-        new_regex_not_empty = new_regex
-
-        # should add points between every two valid chars(the valid chars are alphanumeric,
-        # special chars and escaped chars)
-        if (is_alnum_or_special and
-            is_prev_alnum_or_special and
-            not_escaped and
-            not_sugar and
-            new_regex_not_empty
-        ):
-            new_regex += '~'
-            new_regex += char
-        else:
-            new_regex += char
+        # Either skipping the regex or going through it once.
+        builder.add_transition(initial_state, EPSILON, fragment[0])
+        builder.add_transition(initial_state, EPSILON, final_state)
+        builder.add_transition(fragment[1], EPSILON, final_state)
 
-    return new_regex
+        return initial_state, final_state
     
-def handle_character(char, index, result_queue, regex):
-    if (
-        char in set("\n@-._/:")
-        or char.isalnum()
-        or isEscapedSpace(regex, index)
-        or isEscapedOperator(regex, index)
-    ):
-        result_queue.append(Character(char))
-
-def handle_opened_parenthesis(char, operator_stack):
-    if char == '(':
-        operator_stack.append(char)
-
-def handle_closeed_parenthesis(char, operator_stack, result_queue):
-    if char == ')':
-        # Popping everything from the stack until the opening parenthesis is found.
-        while operator_stack and operator_stack[-1] != '(':
-            result_queue.append(Operator(operator_stack.pop()))
-        operator_stack.pop()
-
-def handle_question(char, result_queue):
-    if char == '?':
-        result_queue.append(Operator(char))
-
-def handle_op(char, operator_stack, result_queue):
-    if char in set("~*|+"):
-        # Popping operators with higher priority from the stack.
-        # The only exception is the opening parenthesis.
-        while (
-            operator_stack
-            and operator_stack[-1] != '('
-            and Operator.priority(operator_stack[-1]) >= Operator.priority(char)
-        ):
-            # Appending the popped operator to the result queue.
-            result_queue.append(Operator(operator_stack.pop()))
-
-        # Appending the current operator to the stack.
-        operator_stack.append(char)
-
-# Receives a list of regexes and returns a single regex of type Concat
-def merge_regexes(regexes: list) -> Regex:
-    merged_regex = regexes[0]
-
-    for regex in regexes[1:]:
-        merged_regex = Concat(merged_regex, regex)
-
-    return merged_regex
-
-def parse_regex(regex: str) -> Regex:
-    result_queue = []
-    operator_stack = []
-
-    # Preprocess.
-    regex = expand_syntactic_sugars(regex)
-    regex = add_concatenation_tilde(regex)
-
-    for index, char in enumerate(regex):
-        handle_character(char, index, result_queue, regex)
-        handle_question(char, result_queue)
-        handle_opened_parenthesis(char, operator_stack)
-        handle_closeed_parenthesis(char, operator_stack, result_queue)
-        handle_op(char, operator_stack, result_queue)
-
-    # Popping the remaining operators from the stack.
-    while operator_stack:
-        result_queue.append(Operator(operator_stack.pop()))
-
-    operator_stack = []
-    op_dict = {'*': Star, '+': Plus, '?': Question, '~': Concat, '|': Union}
-
-    # Encapsulating the result queue into a single / few regexes.
-    for token in result_queue:
-        if isinstance(token, Character):
-            operator_stack.append(token)
-        # Each operator has a different number of operands. Some have 1, some have 2.
-        elif isinstance(token, Operator) and token.op in op_dict:
-            if token.op in {'~', '|'}:  # Operators with 2 operands.
-                regex2, regex1 = operator_stack.pop(), operator_stack.pop()
-                operator_stack.append(op_dict[token.op](regex1, regex2))
-            else:  # Operators with 1 operand.
-                operator_stack.append(op_dict[token.op](operator_stack.pop()))
-
-    # Concat the remaining regexes.
-    return merge_regexes(operator_stack)
+class Repeat(Regex):
+    __match_args__ = ("regex", "minimum", "maximum")
 
+    def __init__(self, regex: Regex, minimum: int, maximum: int | None = None):
+        self.regex = regex
+        self.minimum = minimum
+        # None when there is no upper bound.
+        self.maximum = maximum
+        self.children = (regex,)
+
+    def fragment(self, builder: ThompsonBuilder, fragment: Fragment) -> Fragment:
+        # minimum copies of the regex in a row, then either a looping copy
+        # or maximum - minimum nested optional copies. Only the first copy is
+        # given, the others are built again.
+        copies = [fragment]
+
+        def copy() -> Fragment:
+            return copies.pop() if copies else builder.build(self.regex)
+
+        initial_state = end = builder.new_state()
+        for _ in range(self.minimum):
+            copy_initial_state, copy_final_state = copy()
+            builder.add_transition(end, EPSILON, copy_initial_state)
+            end = copy_final_state
+
+        final_state = builder.new_state()
+        if self.maximum is None:
+            copy_initial_state, copy_final_state = copy()
+            for state in (end, copy_final_state):
+                builder.add_transition(state, EPSILON, copy_initial_state)
+                builder.add_transition(state, EPSILON, final_state)
+        else:
+            for _ in range(self.maximum - self.minimum):
+                copy_initial_state, copy_final_state = copy()
+                builder.add_transition(end, EPSILON, final_state)
+                builder.add_transition(end, EPSILON, copy_initial_state)
+                end = copy_final_state
+            builder.add_transition(end, EPSILON, final_state)
+
+        return initial_state, final_state
+
+class RegexSyntaxError(ValueError):
+    def __init__(self, message: str, regex: str, position: int):
+        super().__init__(f"{message} at position {position} of {regex!r}")
+        self.regex = regex
+        self.position = position
+
+class RegexParser:
+    # Parser reading the regex once from left to right:
+    #   regex       = alternative ('|' alternative)*
+    #   alternative = repetition+
+    #   repetition  = atom ('*' | '+' | '?' | '{m}' | '{m,}' | '{,n}' | '{m,n}')*
+    #   atom        = character | '\' any character | '(' regex ')' | '[' class ']'
+    # A class holds characters and x-y ranges, '^' first negates it. Every
+    # other character stands for itself ('.' too), except unescaped spaces,
+    # which are ignored. A '{' that does not start a repetition is a character.
+    # Groups are kept on a stack rather than parsed recursively, so the
+    # nesting depth is not bounded by the recursion limit.
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.position = 0
+
+    def error(self, message: str, position: int | None = None) -> RegexSyntaxError:
+        return RegexSyntaxError(message, self.regex, self.position if position is None else position)
+
+    def peek(self) -> str | None:
+        # The next character that is not an unescaped space, None at the end.
+        regex, position = self.regex, self.position
+        while position < len(regex) and regex[position] == ' ':
+            position += 1
+        self.position = position
+        return regex[position] if position < len(regex) else None
+
+    def parse(self) -> Regex:
+        # The union and the alternative read so far in the innermost group,
+        # those of the groups around it are on the stack, with the position
+        # of the '(' opening the group.
+        groups = []
+        union = alternative = None
+
+        while (char := self.peek()) is not None:
+            if char == '(':
+                groups.append((self.position, union, alternative))
+                union = alternative = None
+                self.position += 1
+                continue
+            if char == '|':
+                union = self.union(union, alternative)
+                alternative = None
+                self.position += 1
+                continue
+
+            if char == ')':
+                if not groups:
+                    raise self.error("unbalanced ')'")
+                regex = self.union(union, alternative)
+                _, union, alternative = groups.pop()
+                self.position += 1
+            else:
+                regex = self.parse_atom()
+            regex = self.parse_repetition(regex)
+            alternative = regex if alternative is None else Concat(alternative, regex)
+
+        regex = self.union(union, alternative)
+        if groups:
+            raise self.error("missing ')'", groups[-1][0])
+        return regex
+
+    def union(self, union: Regex | None, alternative: Regex | None) -> Regex:
+        # Adds the alternative ending at the current position to the union.
+        if alternative is None:
+            raise self.error('empty regex or alternative')
+        return alternative if union is None else Union(union, alternative)
+
+    def parse_repetition(self, regex: Regex) -> Regex:
+        # The repetitions following an atom.
+        while True:
+            char = self.peek()
+            if char == '*':
+                regex = Star(regex)
+            elif char == '+':
+                regex = Plus(regex)
+            elif char == '?':
+                regex = Question(regex)
+            elif char == '{' and (bounds := self.parse_bounds()) is not None:
+                regex = Repeat(regex, *bounds)
+                continue
+            else:
+                return regex
+            self.position += 1
+
+    def parse_bounds(self) -> tuple[int, int | None] | None:
+        # Reads {m}, {m,}, {,n} or {m,n} when it is there, else leaves the '{' alone.
+        start = self.position
+        self.position += 1
+        minimum = self.parse_number()
+        maximum = minimum
+        if self.peek() == ',':
+            self.position += 1
+            maximum = self.parse_number()
+        if self.peek() != '}' or (minimum is None and maximum is None):
+            self.position = start
+            return None
+        self.position += 1
+
+        minimum = minimum or 0
+        if maximum is not None and maximum < minimum:
+            raise self.error(f'repetition bounds {minimum} > {maximum}', start)
+        return minimum, maximum
+
+    def parse_number(self) -> int | None:
+        digits = ''
+        while (char := self.peek()) is not None and char.isascii() and char.isdigit():
+            digits += char
+            self.position += 1
+        return int(digits) if digits else None
+
+    def parse_atom(self) -> Regex:
+        # An atom other than a group.
+        char = self.peek()
+        if char == '[':
+            return self.parse_class()
+        if char in '*+?':
+            raise self.error(f'nothing to repeat before {char!r}')
+        return Character(self.parse_character())
+
+    def parse_character(self) -> str:
+        # A single character, escaped or not.
+        char = self.regex[self.position]
+        self.position += 1
+        if char == '\\':
+            if self.position == len(self.regex):
+                raise self.error('trailing backslash', self.position - 1)
+            char = self.regex[self.position]
+            self.position += 1
+        return char
+
+    def parse_class(self) -> Regex:
+        start = self.position
+        self.position += 1
+        negated = self.peek() == '^'
+        if negated:
+            self.position += 1
+
+        chars = []
+        ranges = []
+        while (char := self.peek()) != ']':
+            if char is None:
+                raise self.error("missing ']'", start)
+            first = self.parse_character()
+            if self.peek() == '-':
+                dash_position = self.position
+                self.position += 1
+                if self.peek() not in (']', None):
+                    last = self.parse_character()
+                    if last < first:
+                        raise self.error(f'empty range {first}-{last}', dash_position)
+                    ranges.append((first, last))
+                    continue
+                # A '-' closing the class is a character, read next.
+                self.position = dash_position
+            chars.append(first)
+        self.position += 1
+
+        if not negated:
+            # The simple classes are the nodes the previous parser made for them.
+            if not chars and len(ranges) == 1:
+                return CharacterRange(*ranges[0])
+            if len(chars) == 1 and not ranges:
+                return Character(chars[0])
+
+        char_set = char_set_union(char_set_of(chars), [(ord(first), ord(last)) for first, last in ranges])
+        if negated:
+            char_set = char_set_complement(char_set)
+        if not char_set:
+            raise self.error('class matching no character', start)
+        return CharacterClass(char_set)
 
-    
+def parse_regex(regex: str) -> Regex:
+    # Regexes are immutable, the same regex string can share its result.
+    parsed = parsed_regexes.get(regex)
+    if parsed is None:
+        parsed = RegexParser(regex).parse()
+        parsed_regexes.put(regex, parsed)
+
+    return parsed
+
+# Receives a regex and returns the character sets of all its characters and ranges.
+def character_sets(regex: Regex) -> Iterator[CharSet]:
+    stack = [regex]
+    # Shared sub-expressions are only walked once.
+    seen = set()
+
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+
+        match node:
+            case Character() as character:
+                yield character.char_set
+            case Concat(left, right) | Union(left, right):
+                stack.extend((left, right))
+            case Star(inner) | Plus(inner) | Question(inner) | Repeat(inner):
+                stack.append(inner)
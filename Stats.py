@@ -0,0 +1,91 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+import heapq
+import time
+
+
+@dataclass
+class CompileStats:
+    # What building a lexer cost: the seconds spent in each phase (parse,
+    # alphabet, thompson, subset_construction, minimize, compile), the sizes of
+    # the automata, and the sizes each token alone compiles to, as (NFA states,
+    # DFA states). A token whose DFA alone is large is the one blowing up the
+    # lexer. Lazy lexers have no DFA size until they lex: dfa_states are the
+    # states built so far, and the DFA size of the tokens is None.
+    timings: dict[str, float] = field(default_factory=dict)
+    nfa_states: int = 0
+    # The states created by the subset construction, before minimization.
+    dfa_states: int = 0
+    # None when the DFA was not minimized, or is built while lexing (lazy).
+    minimal_dfa_states: int | None = None
+    classes: int = 0
+    token_sizes: dict[str, tuple[int, int | None]] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def no_phase(name: str) -> nullcontext:
+    # Stands for CompileStats.phase when no stats are kept.
+    return nullcontext()
+
+
+@dataclass
+class LexStats:
+    # What lexing an input cost. Every character the DFA steps on is a
+    # transition, the ones stepped on past the end of the token found are
+    # rescanned by the next token: a high rescanned count means backtracking.
+    # Sizes are in characters, or in bytes for bytes inputs.
+    names: list[str]
+    size: int = 0
+    seconds: float = 0.0
+    tokens: int = 0
+    transitions: int = 0
+    rescanned: int = 0
+    # Whether the input could not be lexed entirely.
+    failed: bool = False
+    # For lazy lexers: the DFA states built during the run, and how many times
+    # the cache outgrew its memory budget.
+    states_built: int = 0
+    flushes: int = 0
+    token_counts: dict[str, int] = field(default_factory=dict)
+    token_sizes: dict[str, int] = field(default_factory=dict)
+    # The longest tokens, as (size, start, name), longest first.
+    longest: list[tuple[int, int, str]] = field(default_factory=list)
+
+    # The number of longest tokens kept.
+    max_longest = 10
+
+    def record(self, token_index: int, start: int, end: int, stop: int) -> None:
+        # A token found from start to end by a scan stopped at stop.
+        self.transitions += stop - start
+        self.rescanned += stop - end
+        self.tokens += 1
+
+        name = self.names[token_index]
+        self.token_counts[name] = self.token_counts.get(name, 0) + 1
+        self.token_sizes[name] = self.token_sizes.get(name, 0) + end - start
+
+        # A min heap while lexing, sorted when the run is over.
+        longest = (end - start, start, name)
+        if len(self.longest) < self.max_longest:
+            heapq.heappush(self.longest, longest)
+        elif longest > self.longest[0]:
+            heapq.heapreplace(self.longest, longest)
+
+    def record_failure(self, start: int, stop: int) -> None:
+        self.transitions += stop - start
+        self.failed = True
+
+    def finish(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.longest.sort(reverse=True)
+
+
+type StatsHook = Callable[[CompileStats | LexStats], None]
@@ -0,0 +1,191 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from itertools import compress
+import mmap
+
+from .GapColumn import GapColumn
+from .NewlineIndex import NewlineIndex, Source
+
+
+@dataclass(frozen=True, slots=True)
+class Token:
+    # A token of an input lexed as it arrives (Lexer.alex), with its offsets in
+    # the input. Its line and column are only looked up when asked for, in
+    # the newline index of the input, which grows as more of it is read.
+    name: str
+    lexeme: str
+    start: int
+    end: int
+    newline_index: NewlineIndex = field(repr=False, compare=False)
+
+    @property
+    def line(self) -> int:
+        return self.newline_index.line_of(self.start)
+
+    @property
+    def column(self) -> int:
+        return self.newline_index.position(self.start)[1]
+
+
+class TokenStream:
+    # The tokens of a source, stored column by column: the token index (in spec
+    # order), the start and end offsets in the source and optionally the line of
+    # every token. A token is only turned into a (name, lexeme) tuple when it is
+    # accessed. Lexemes of bytes sources are decoded with the given encoding.
+    def __init__(self, names: list[str], source: Source, encoding: str = 'latin-1',
+                 with_lines: bool = False, incremental: bool = False) -> None:
+        self.names = names
+        self.source = source
+        self.encoding = encoding
+        self.token_ids = array('H' if len(names) <= 0xFFFF else 'I')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.lines = array('q') if with_lines else None
+        # For every token, the end of the input read to find it or any token
+        # before it (the scan reads one character past the token). Lexer.relex
+        # needs it to know which tokens an edit can change.
+        self.reaches = array('q') if incremental else None
+        # The error message lex would return, when the source could not be lexed entirely.
+        self.error = None
+        # The LexStats of the run, when the lexer keeps stats.
+        self.stats = None
+        # Built by line_index the first time a position is asked for.
+        self.newline_index = None
+
+    def append(self, token_id: int, start: int, end: int, line: int = 0, reach: int = 0) -> None:
+        self.token_ids.append(token_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        if self.lines is not None:
+            self.lines.append(line)
+        if self.reaches is not None:
+            self.reaches.append(max(reach, self.reaches[-1]) if self.reaches else reach)
+
+    def replace(self, first: int, last: int, token_ids: list[int], starts: list[int],
+                ends: list[int], lines: list[int], reaches: list[int], delta: int,
+                line_delta: int) -> None:
+        # Replaces the tokens [first, last) with the given ones, the tokens
+        # after them move by delta characters and line_delta lines. The
+        # columns become gap columns: an edit only moves the tokens between it
+        # and the previous one, the rest of the stream is left as it is.
+        if not isinstance(self.starts, GapColumn):
+            self.token_ids = GapColumn(self.token_ids)
+            self.starts = GapColumn(self.starts)
+            self.ends = GapColumn(self.ends)
+            if self.lines is not None:
+                self.lines = GapColumn(self.lines)
+            if self.reaches is not None:
+                self.reaches = GapColumn(self.reaches)
+
+        self.token_ids.replace(first, last, token_ids)
+        self.starts.replace(first, last, starts, delta)
+        self.ends.replace(first, last, ends, delta)
+        if self.lines is not None:
+            self.lines.replace(first, last, lines, line_delta)
+        if self.reaches is not None:
+            self.reaches.replace(first, last, reaches, delta)
+            # The new tokens may have read further than the ones after them did.
+            index = first + len(reaches)
+            if index > 0:
+                reach = self.reaches[index - 1]
+                while index < len(self) and self.reaches[index] < reach:
+                    self.reaches[index] = reach
+                    index += 1
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def __getitem__(self, index: int | slice) -> 'tuple[str, str] | TokenStream':
+        if isinstance(index, slice):
+            return self.select(index)
+        return self.names[self.token_ids[index]], self.lexeme(index)
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        names, source = self.names, self.source
+        if isinstance(source, str):
+            for token_id, start, end in self.offsets():
+                yield names[token_id], source[start:end]
+        else:
+            for token_id, start, end in self.offsets():
+                yield names[token_id], source[start:end].decode(self.encoding)
+
+    @property
+    def line_index(self) -> NewlineIndex:
+        if self.newline_index is None:
+            self.newline_index = NewlineIndex(self.source)
+        return self.newline_index
+
+    def position(self, index: int) -> tuple[int, int]:
+        # The line and column where the token starts, counted from 0.
+        return self.line_index.position(self.starts[index])
+
+    def name(self, index: int) -> str:
+        return self.names[self.token_ids[index]]
+
+    def lexeme(self, index: int) -> str:
+        lexeme = self.source[self.starts[index]:self.ends[index]]
+        return lexeme if isinstance(lexeme, str) else lexeme.decode(self.encoding)
+
+    def offsets(self) -> Iterator[tuple[int, int, int]]:
+        return zip(self.token_ids, self.starts, self.ends)
+
+    def select(self, index: slice) -> 'TokenStream':
+        selected = TokenStream(self.names, self.source, self.encoding)
+        selected.newline_index = self.newline_index
+        selected.token_ids = self.token_ids[index]
+        selected.starts = self.starts[index]
+        selected.ends = self.ends[index]
+        selected.lines = self.lines[index] if self.lines is not None else None
+        selected.reaches = self.reaches[index] if self.reaches is not None else None
+        # The error comes after the last token, it only belongs to the slices reaching the end.
+        if index.indices(len(self))[1] >= len(self) and (index.step or 1) > 0:
+            selected.error = self.error
+        return selected
+
+    def ids_of(self, names: Iterable[str]) -> set[int]:
+        names = set(names)
+        return {token_id for token_id, name in enumerate(self.names) if name in names}
+
+    def keep(self, names: Iterable[str]) -> 'TokenStream':
+        token_ids = self.ids_of(names)
+        return self.filter([token_id in token_ids for token_id in self.token_ids])
+
+    def drop(self, names: Iterable[str]) -> 'TokenStream':
+        token_ids = self.ids_of(names)
+        return self.filter([token_id not in token_ids for token_id in self.token_ids])
+
+    def filter(self, mask: Iterable[bool]) -> 'TokenStream':
+        # Every column is filtered with the same mask, no token is materialized.
+        mask = list(mask)
+        filtered = TokenStream(self.names, self.source, self.encoding)
+        filtered.newline_index = self.newline_index
+        filtered.token_ids = array(self.token_ids.typecode, compress(self.token_ids, mask))
+        filtered.starts = array('q', compress(self.starts, mask))
+        filtered.ends = array('q', compress(self.ends, mask))
+        if self.lines is not None:
+            filtered.lines = array('q', compress(self.lines, mask))
+        if self.reaches is not None:
+            filtered.reaches = array('q', compress(self.reaches, mask))
+        filtered.error = self.error
+        return filtered
+
+    def to_list(self) -> list[tuple[str, str]]:
+        # The format returned by Lexer.lex.
+        if self.error is not None:
+            return self.error
+
+        names, source = self.names, self.source
+        if isinstance(source, str):
+            return [(names[token_id], source[start:end]) for token_id, start, end in self.offsets()]
+        return list(self)
+
+    def close(self) -> None:
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
+    def __enter__(self) -> 'TokenStream':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,55 @@
+# DFA.accept_many against one DFA.accept call per word, on 100k short
+# identifiers and field values, best of a few runs each. Without NumPy both
+# take the same path.
+#
+# Run from the directory containing the package: python -m src.benchmarks.accept_many
+
+from collections.abc import Callable
+import random
+import time
+
+from src.DFA import numpy
+from src.Lexer import Lexer
+from src.benchmarks.specs import LANGUAGE_SPEC
+
+NR_WORDS = 100000
+REPEATS = 5
+LETTERS = "abcdefghijklmnopqrstuvwyzABZ_"
+DIGITS = "0123456789"
+
+
+def identifier(rng: random.Random) -> str:
+    return rng.choice(LETTERS) + "".join(rng.choice(LETTERS + DIGITS) for _ in range(rng.randint(0, 15)))
+
+
+def field_value(rng: random.Random) -> str:
+    return "".join(rng.choice(DIGITS + LETTERS + "-.") for _ in range(rng.randint(0, 16)))
+
+
+def best_time(function: Callable[[], object]) -> float:
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    rng = random.Random(0)
+    words = [identifier(rng) if rng.random() < 0.8 else field_value(rng) for _ in range(NR_WORDS)]
+    # The ID token alone, compiled over the same classes as the lexer.
+    table = Lexer([spec for spec in LANGUAGE_SPEC if spec[0] == "ID"]).table
+
+    expected = [table.accept(word) for word in words]
+    assert list(table.accept_many(words)) == expected
+    accept_time = best_time(lambda: [table.accept(word) for word in words])
+    accept_many_time = best_time(lambda: table.accept_many(words))
+
+    print(f"numpy: {'yes' if numpy is not None else 'no'}, {sum(expected)} of {NR_WORDS} words accepted")
+    print(f"accept: {accept_time:.3f}s, accept_many: {accept_many_time:.3f}s, "
+          f"speedup {accept_time / accept_many_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Maximal munch on the pathological family: tokens a and a*b against a run of
+# a's. The default lex rescans the whole run from every token start, the linear
+# mode never rescans a (state, position) pair.
+#
+# Run from the directory containing the package: python -m src.benchmarks.backtracking
+
+import time
+
+from src.Lexer import Lexer
+from src.benchmarks.specs import BACKTRACKING_SPEC
+
+SIZES = [1000, 2000, 4000, 8000]
+
+
+def time_lex(lexer: Lexer, word: str, linear: bool) -> float:
+    start = time.perf_counter()
+    lexer.lex(word, linear=linear)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    lexer = Lexer(BACKTRACKING_SPEC)
+
+    print(f"{'n':>8} {'default (s)':>12} {'linear (s)':>12}")
+    for size in SIZES:
+        word = "a" * size
+        assert lexer.lex(word) == lexer.lex(word, linear=True)
+
+        default_time = time_lex(lexer, word, linear=False)
+        linear_time = time_lex(lexer, word, linear=True)
+        print(f"{size:>8} {default_time:>12.4f} {linear_time:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Generated lexer modules against Lexer.lex: the outputs are compared on
+# valid inputs, inputs with errors and characters outside the rows, then the
+# lexing times are reported.
+#
+# Run from the directory containing the package: python -m src.benchmarks.codegen
+
+import random
+import tempfile
+import time
+
+from src.Codegen import load_module
+from src.Lexer import Lexer
+from src.benchmarks.specs import BACKTRACKING_SPEC, LANGUAGE_SPEC
+
+TEXT = "def foo a1 return 3.14 + bar_Baz * 42\n@deco /usr/lib_2/a-b.c\n" * 5000
+CHARS = "abcdefz019 _\n.+-*/@#éĀ中"
+NR_RANDOM_TEXTS = 2000
+
+
+def check(lexer: Lexer, lex, texts: list[str]) -> None:
+    for text in texts:
+        expected, result = lexer.lex(text), lex(text)
+        assert expected == result, (text, expected, result)
+
+
+def main() -> None:
+    rng = random.Random(0)
+    texts = ["".join(rng.choice(CHARS) for _ in range(rng.randint(0, 40)))
+             for _ in range(NR_RANDOM_TEXTS)]
+    texts += [TEXT[:1000], TEXT[:1000] + "#", "中" + TEXT[:100], ""]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"{'spec':>13} {'lex (s)':>8} {'generated (s)':>14} {'speedup':>8}")
+        for name, spec, text in (("language", LANGUAGE_SPEC, TEXT),
+                                 ("backtracking", BACKTRACKING_SPEC, "a" * 1000)):
+            lexer = Lexer(spec)
+            module = load_module(lexer, cache_dir)
+            # The second load imports the cached file.
+            assert load_module(lexer, cache_dir).lex(text) == load_module(lexer).lex(text)
+            check(lexer, module.lex, texts + [text])
+
+            start = time.perf_counter()
+            lexer.lex(text)
+            lex_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            module.lex(text)
+            generated_time = time.perf_counter() - start
+
+            print(f"{name:>13} {lex_time:>8.3f} {generated_time:>14.3f} {lex_time / generated_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Eager and lazy lexers: build time, DFA states built and lexing time.
+#
+# Run from the directory containing the package: python -m src.benchmarks.lazy
+
+import time
+
+from src.Lexer import Lexer
+from src.benchmarks.specs import LANGUAGE_SPEC
+
+# Many keywords sharing prefixes, next to the identifiers they overlap with.
+KEYWORDS_SPEC = (
+    [(f"KW{index}", f"k{index}w{index * 7 % 100}") for index in range(300)] +
+    [("ID", "[a-z]([a-z]|[0-9])*"), ("SPACE", "\\ ")]
+)
+
+TEXTS = {
+    "language": "def foo a1 return 3.14 + bar_Baz * 42\n@deco /usr/lib_2/a-b.c\n" * 2000,
+    "keywords": "k1w7 k12w84 abc k299w93 k3 " * 4000,
+}
+
+
+def main() -> None:
+    print(f"{'spec':>10} {'mode':>6} {'build (s)':>10} {'lex (s)':>9} {'states':>7}")
+    for name, spec in (("language", LANGUAGE_SPEC), ("keywords", KEYWORDS_SPEC)):
+        for lazy in (False, True):
+            start = time.perf_counter()
+            lexer = Lexer(spec, lazy=lazy)
+            build_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            lexer.lex(TEXTS[name])
+            lex_time = time.perf_counter() - start
+
+            mode = "lazy" if lazy else "eager"
+            print(f"{name:>10} {mode:>6} {build_time:>10.4f} {lex_time:>9.4f} {lexer.table.nr_states:>7}")
+
+
+if __name__ == "__main__":
+    main()
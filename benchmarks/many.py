@@ -0,0 +1,45 @@
+# Throughput of Lexer.lex_many on many small documents, lexed in place and
+# through thread and process pools of 1 and N workers. Lexing is pure Python,
+# so only processes can use more than one core.
+#
+# Run from the directory containing the package: python -m src.benchmarks.many
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import time
+
+from src.Lexer import Lexer
+from src.benchmarks.specs import LANGUAGE_SPEC
+
+NR_DOCUMENTS = 20000
+DOCUMENTS = [f"def foo{index} a1 return 3.14 + bar_Baz * {index}\n@deco /usr/lib_2/a-b.c\n"
+             for index in range(NR_DOCUMENTS)]
+
+
+def main() -> None:
+    lexer = Lexer(LANGUAGE_SPEC)
+    expected = [lexer.lex(document) for document in DOCUMENTS]
+    nr_cores = os.cpu_count() or 1
+
+    print(f"{'executor':>12} {'workers':>8} {'time (s)':>9} {'docs/s':>9} {'MB/s':>6}")
+    runs = [("none", None, 1)]
+    for workers in sorted({1, nr_cores, 2 * nr_cores}):
+        runs.append(("threads", ThreadPoolExecutor, workers))
+        runs.append(("processes", ProcessPoolExecutor, workers))
+
+    size = sum(map(len, DOCUMENTS))
+    for name, executor_class, workers in runs:
+        executor = executor_class(workers) if executor_class else None
+        start = time.perf_counter()
+        results = list(lexer.lex_many(DOCUMENTS, executor))
+        elapsed = time.perf_counter() - start
+        if executor:
+            executor.shutdown()
+
+        assert results == expected
+        print(f"{name:>12} {workers:>8} {elapsed:>9.3f} {NR_DOCUMENTS / elapsed:>9.0f} "
+              f"{size / elapsed / 1e6:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
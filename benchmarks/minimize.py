@@ -0,0 +1,26 @@
+# DFA size and Lexer build time with and without minimization.
+#
+# Run from the directory containing the package: python -m src.benchmarks.minimize
+
+import time
+
+from src.Lexer import Lexer
+from src.benchmarks.specs import LANGUAGE_SPEC
+
+
+def build(minimize: bool) -> tuple[Lexer, float]:
+    start = time.perf_counter()
+    lexer = Lexer(LANGUAGE_SPEC, minimize=minimize)
+    return lexer, time.perf_counter() - start
+
+
+def main() -> None:
+    print(f"{'':>12} {'states':>8} {'table size':>12} {'build (s)':>10}")
+    for minimize in (False, True):
+        lexer, build_time = build(minimize)
+        name = "minimized" if minimize else "subset"
+        print(f"{name:>12} {lexer.table.nr_states:>8} {len(lexer.table.d):>12} {build_time:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Specs shared by the benchmarks. They only use the syntax parse_regex accepts.
+
+KEYWORDS = ["if", "else", "while", "for", "return", "def", "class", "import", "from", "lambda"]
+
+# A small programming language: keywords, identifiers, numbers and punctuation.
+LANGUAGE_SPEC = (
+    [(keyword.upper(), keyword) for keyword in KEYWORDS] +
+    [
+        ("ID", "([a-z]|[A-Z]|_)([a-z]|[A-Z]|[0-9]|_)*"),
+        ("FLOAT", "[0-9]+.[0-9]+"),
+        ("INT", "[0-9]+"),
+        ("PATH", "(/([a-z]|[0-9]|.|_|-)+)+"),
+        ("DECORATOR", "@([a-z]|_)+"),
+        ("PLUS", "\\+"),
+        ("STAR", "\\*"),
+        ("MINUS", "-"),
+        ("DOT", "."),
+        ("SPACE", "\\ "),
+        ("NEWLINE", "\n"),
+    ]
+)
+
+# The pathological maximal munch family: a run of a's never completes a*b.
+BACKTRACKING_SPEC = [("A", "a"), ("AB", "a*b")]
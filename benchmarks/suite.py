@@ -0,0 +1,396 @@
+# The benchmark suite: compile time, automaton sizes, peak memory and lexing
+# throughput of synthetic and realistic specs, on inputs from 1 KB up to
+# 100 MB. The results are written as JSON, and compared against the JSON of
+# an earlier run with --compare: any regression beyond the tolerance makes the
+# run exit with an error.
+#
+# Run from the directory containing the package:
+#   python -m src.benchmarks.suite --output results.json
+#   python -m src.benchmarks.suite --compare results.json
+#   python -m src.benchmarks.suite --full                  (up to 100 MB per spec)
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from src.Alphabet import Alphabet
+from src.DFA import numpy
+from src.Lexer import Lexer, compiled_tables
+from src.Regex import character_sets, parse_regex, parsed_regexes
+from src.benchmarks.specs import BACKTRACKING_SPEC, KEYWORDS, LANGUAGE_SPEC
+
+SIZES = "1K,64K,1M"
+FULL_SIZES = "1K,64K,1M,10M,100M"
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# The inputs are built from a block of random tokens of this size, repeated.
+BLOCK_SIZE = 1 << 16
+# Inputs larger than this are lexed once whatever the number of repeats.
+MAX_REPEATED_SIZE = 1 << 20
+
+# Timings are noisy, they only count as regressions past the tolerance and
+# when they lose more than MIN_SECONDS. Peak memory does not depend on the
+# timing noise, it is a regression past the tolerance whatever the time.
+# Automaton sizes are exact: any growth is a regression.
+MIN_SECONDS = 1e-3
+TIME_METRICS = ("seconds",)
+RATE_METRICS = ("mb_per_s", "tokens_per_s")
+MEMORY_METRICS = ("peak_bytes",)
+COUNT_METRICS = ("nfa_states", "dfa_states", "min_dfa_states")
+
+
+@dataclass
+class Workload:
+    name: str
+    spec: list[tuple[str, str]]
+    # Appends the pieces of the input, separators included, until the size is reached.
+    piece: Callable[[random.Random], str]
+    modes: tuple[str, ...] = ("lex",)
+    # The largest input of each mode, for the modes too slow to run on every size.
+    max_sizes: dict[str, int] = field(default_factory=dict)
+
+
+def language_piece(rng: random.Random) -> str:
+    words = ["def", "return", "foo_1", "Bar", "x", "3.14", "42", "+", "*", "-",
+             "@deco", "/usr/lib_2/a-b.c", "lambda", "import", "os"]
+    return rng.choice(words) + rng.choice([" ", " ", " ", "\n"])
+
+
+JSON_SPEC = [
+    ("LBRACE", "{"), ("RBRACE", "}"), ("LBRACKET", "\\["), ("RBRACKET", "\\]"),
+    ("COLON", ":"), ("COMMA", ","),
+    ("TRUE", "true"), ("FALSE", "false"), ("NULL", "null"),
+    ("NUMBER", "-?(0|[1-9][0-9]*)(\\.[0-9]+)?([eE][+\\-]?[0-9]+)?"),
+    ("STRING", '"([^"\\\\\n]|\\\\["\\\\/bfnrtu])*"'),
+    ("SPACE", "[\\ \t\n]+"),
+]
+
+
+def json_piece(rng: random.Random) -> str:
+    key = "".join(rng.choice("abcdefgh") for _ in range(rng.randint(1, 8)))
+    value = rng.choice([
+        str(rng.randint(-1000, 100000)), f"{rng.uniform(-1, 1):.6f}", "1.5e-3",
+        "true", "false", "null", '"caf\\u00e9 \\"quoted\\""', '[1, 2, 3]',
+    ])
+    return f'{{"{key}": {value}, "n": [{rng.randint(0, 9)}]}},\n'
+
+
+# Hundreds of keywords sharing prefixes, next to the identifiers they overlap with.
+KEYWORDS_SPEC = (
+    [(keyword.upper(), keyword) for keyword in KEYWORDS] +
+    [(f"KW{index}", f"k{index}w{index * 7 % 100}") for index in range(400)] +
+    [("ID", "[a-z_][a-z0-9_]*"), ("SPACE", "\\ ")]
+)
+
+
+def keywords_piece(rng: random.Random) -> str:
+    if rng.random() < 0.6:
+        index = rng.randrange(400)
+        word = f"k{index}w{index * 7 % 100}"
+    elif rng.random() < 0.5:
+        word = rng.choice(KEYWORDS)
+    else:
+        word = "k" + "".join(rng.choice("0123456789w") for _ in range(rng.randint(0, 6)))
+    return word + " "
+
+
+# Many character classes, mostly outside ASCII: the alphabet gets many classes.
+RANGES_SPEC = [
+    ("HEX", "0x[0-9a-fA-F]+"),
+    ("NUMBER", "[0-9]+"),
+    ("ID", "[a-zA-Z_][a-zA-Z0-9_]*"),
+    ("GREEK", "[α-ωΑ-Ω]+"),
+    ("CYRILLIC", "[а-яА-Я]+"),
+    ("HAN", "[一-龥]+"),
+    ("KANA", "[ぁ-ゖァ-ヺ]+"),
+    ("ARROW", "[←-⇿]"),
+    ("EMOJI", "[😀-🙏]"),
+    ("PUNCT", "[!-/:-@]"),
+    ("SPACE", "[\\ \t\n]"),
+]
+
+RANGES_ALPHABETS = ["0123456789", "abcdefXYZ_", "αβγδωΔΩ", "абвгяДЯ", "一二三龥", "あいアイ",
+                    "←→⇿", "😀🙏", "!/:@"]
+
+
+def ranges_piece(rng: random.Random) -> str:
+    letters = rng.choice(RANGES_ALPHABETS)
+    word = "".join(rng.choice(letters) for _ in range(rng.randint(1, 8)))
+    if letters[0] in "←😀!":
+        word = word[0]
+    return rng.choice(["", "0x1f"]) + word + rng.choice([" ", "\n"])
+
+
+def nested_regex(depth: int) -> str:
+    # ((((a|b)*c|d)*e|f)*...): every level adds a Star over a Union.
+    regex = "a"
+    for level in range(depth):
+        regex = f"({regex}|{'bcdefghijklmnop'[level % 15]})*{'qrstuvwxyz'[level % 10]}"
+    return regex
+
+
+NESTED_SPEC = [("NESTED", nested_regex(12)), ("WORD", "[a-z]+"), ("SPACE", "\\ ")]
+
+
+def nested_piece(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefqrstuvwxyz") for _ in range(rng.randint(1, 24))) + " "
+
+
+# The maximal munch worst case: the runs of a's rarely end with a b.
+PATHOLOGICAL_SPEC = BACKTRACKING_SPEC + [("SPACE", "\\ ")]
+
+
+def pathological_piece(rng: random.Random) -> str:
+    return "a" * rng.randint(1, 512) + rng.choice(["b", "", "", ""]) + " "
+
+
+WORKLOADS = [
+    Workload("language", LANGUAGE_SPEC, language_piece),
+    Workload("json", JSON_SPEC, json_piece),
+    Workload("keywords", KEYWORDS_SPEC, keywords_piece),
+    Workload("ranges", RANGES_SPEC, ranges_piece),
+    Workload("nested", NESTED_SPEC, nested_piece),
+    Workload("pathological", PATHOLOGICAL_SPEC, pathological_piece, ("lex", "lex_linear"),
+             {"lex": MAX_REPEATED_SIZE}),
+]
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    if size[-1] in UNITS:
+        return int(float(size[:-1]) * UNITS[size[-1]])
+    return int(size)
+
+
+def make_input(workload: Workload, size: int, seed: int) -> str:
+    # Up to BLOCK_SIZE the input is random pieces, larger inputs repeat a
+    # block of pieces. Inputs always end after a whole piece, so they lex.
+    rng = random.Random(seed)
+    pieces = []
+    length = 0
+    while length < min(size, BLOCK_SIZE):
+        piece = workload.piece(rng)
+        pieces.append(piece)
+        length += len(piece)
+
+    block = "".join(pieces)
+    return block * -(-size // len(block))
+
+
+def best_time(function: Callable[[], object], repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def build_cold(spec: list[tuple[str, str]]) -> Lexer:
+    # A compilation from scratch, not served by the caches of earlier builds.
+    compiled_tables.clear()
+    parsed_regexes.clear()
+    return Lexer(spec)
+
+
+def compile_results(workload: Workload, repeat: int) -> list[dict]:
+    # The whole build of the lexer, then each of its stages on their own.
+    spec = workload.spec
+    seconds, lexer = best_time(lambda: build_cold(spec), repeat)
+    peak = peak_memory(lambda: build_cold(spec))
+
+    def parse() -> list:
+        parsed_regexes.clear()
+        return [parse_regex(regex) for _, regex in spec]
+
+    parse_time, regexes = best_time(parse, repeat)
+    alphabet_time, alphabet = best_time(
+        lambda: Alphabet(char_set for regex in regexes for char_set in character_sets(regex)), repeat)
+    thompson_time, (nfa, token_of_state) = best_time(
+        lambda: lexer.build_combined_nfa(regexes, alphabet), repeat)
+    subset_time, dfa = best_time(nfa.subset_construction, repeat)
+
+    final_tokens = {
+        state: min(token_of_state[s] for s in state if s in token_of_state)
+        for state in dfa.F
+    }
+    minimize_time, minimal_dfa = best_time(lambda: dfa.minimize(final_tokens.get), repeat)
+
+    base = {"spec": workload.name, "size": None}
+    return [
+        base | {"stage": "compile", "seconds": seconds, "peak_bytes": peak,
+                "nfa_states": len(nfa.K), "dfa_states": len(dfa.K),
+                "min_dfa_states": len(minimal_dfa.K), "classes": lexer.table.nr_classes},
+        base | {"stage": "parse", "seconds": parse_time},
+        base | {"stage": "alphabet", "seconds": alphabet_time},
+        base | {"stage": "thompson", "seconds": thompson_time, "nfa_states": len(nfa.K)},
+        base | {"stage": "subset_construction", "seconds": subset_time, "dfa_states": len(dfa.K)},
+        base | {"stage": "minimize", "seconds": minimize_time, "min_dfa_states": len(minimal_dfa.K)},
+    ]
+
+
+def lex_results(workload: Workload, lexer: Lexer, size: int, seed: int, repeat: int,
+                memory: bool) -> list[dict]:
+    text = make_input(workload, size, seed)
+    nr_bytes = len(text.encode("utf-8"))
+    if size > MAX_REPEATED_SIZE:
+        repeat = 1
+
+    results = []
+    for mode in workload.modes:
+        if size > workload.max_sizes.get(mode, size):
+            print(f"{workload.name}: {mode} skipped on {format_size(size)}", file=sys.stderr)
+            continue
+
+        linear = mode == "lex_linear"
+        seconds, tokens = best_time(lambda: lexer.lex(text, linear), repeat)
+        if tokens and tokens[0][0] == "":
+            raise RuntimeError(f"{workload.name}: the benchmark input does not lex: {tokens[0][1]}")
+
+        result = {"spec": workload.name, "stage": mode, "size": size, "bytes": nr_bytes,
+                  "tokens": len(tokens), "seconds": seconds,
+                  "mb_per_s": nr_bytes / seconds / 1e6, "tokens_per_s": len(tokens) / seconds}
+        if memory:
+            result["peak_bytes"] = peak_memory(lambda: lexer.lex(text, linear))
+        results.append(result)
+
+    return results
+
+
+def run(workloads: list[Workload], sizes: list[int], seed: int, repeat: int, memory: bool) -> dict:
+    results = []
+    for workload in workloads:
+        results.extend(compile_results(workload, repeat))
+        lexer = Lexer(workload.spec)
+        for size in sizes:
+            for result in lex_results(workload, lexer, size, seed, repeat, memory):
+                print_result(result, file=sys.stderr)
+                results.append(result)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "numpy": numpy is not None,
+            "seed": seed,
+            "repeat": repeat,
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def print_result(result: dict, file=sys.stdout) -> None:
+    size = "" if result["size"] is None else format_size(result["size"])
+    line = f"{result['spec']:>12} {result['stage']:>20} {size:>6} {result['seconds']:>10.4f}s"
+    if "mb_per_s" in result:
+        line += f" {result['mb_per_s']:>8.2f} MB/s {result['tokens_per_s']:>12.0f} tokens/s"
+    for metric in COUNT_METRICS:
+        if metric in result:
+            line += f" {metric}={result[metric]}"
+    if "peak_bytes" in result:
+        line += f" peak={result['peak_bytes'] / 1e6:.1f}MB"
+    print(line, file=file)
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return str(size)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # The regressions of the results against the baseline, on the measures both have.
+    def key(result: dict) -> tuple:
+        return result["spec"], result["stage"], result["size"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        old = baseline_results.get(key(result))
+        if old is None:
+            continue
+
+        name = "/".join([result["spec"], result["stage"]] +
+                        ([format_size(result["size"])] if result["size"] is not None else []))
+        # Too small a difference to tell from the noise, the timings are not compared.
+        timed = result["seconds"] - old["seconds"] >= MIN_SECONDS
+        for metric in (TIME_METRICS if timed else ()) + MEMORY_METRICS:
+            if metric in result and metric in old and result[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {old[metric]:.6g} -> {result[metric]:.6g} "
+                                   f"(+{(result[metric] / old[metric] - 1) * 100:.0f}%)")
+        for metric in RATE_METRICS if timed else ():
+            if metric in result and metric in old and result[metric] < old[metric] / (1 + tolerance):
+                regressions.append(f"{name}: {metric} {old[metric]:.6g} -> {result[metric]:.6g} "
+                                   f"(-{(1 - result[metric] / old[metric]) * 100:.0f}%)")
+        for metric in COUNT_METRICS:
+            if metric in result and metric in old and result[metric] > old[metric]:
+                regressions.append(f"{name}: {metric} {old[metric]} -> {result[metric]}")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lexer compile and lex benchmarks.")
+    parser.add_argument("--sizes", default=SIZES,
+                        help=f"comma separated input sizes, with K/M/G suffixes (default {SIZES})")
+    parser.add_argument("--full", action="store_true", help=f"use the sizes {FULL_SIZES}")
+    parser.add_argument("--specs", help="comma separated spec names, among "
+                        + ", ".join(workload.name for workload in WORKLOADS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measure, the best is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory of lexing")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative slowdown allowed before a timing counts as a regression")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in (FULL_SIZES if args.full else args.sizes).split(",")]
+    workloads = WORKLOADS
+    if args.specs:
+        names = args.specs.split(",")
+        unknown = set(names) - {workload.name for workload in WORKLOADS}
+        if unknown:
+            parser.error(f"unknown specs: {', '.join(sorted(unknown))}")
+        workloads = [workload for workload in WORKLOADS if workload.name in names]
+
+    results = run(workloads, sizes, args.seed, args.repeat, not args.no_memory)
+    for result in results["results"]:
+        print_result(result)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.compare}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nno regressions against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Thompson construction time on long alternations and concatenations. The time
+# per regex node should stay flat as the regexes grow.
+#
+# Run from the directory containing the package: python -m src.benchmarks.thompson
+
+import time
+
+from src.Regex import Character, Concat, Regex, Union
+
+SIZES = [1000, 2000, 4000, 8000, 16000]
+
+
+def alternation(size: int) -> Regex:
+    regex = Character("a")
+    for index in range(1, size):
+        regex = Union(regex, Character("ab"[index % 2]))
+    return regex
+
+
+def concatenation(size: int) -> Regex:
+    regex = Character("a")
+    for index in range(1, size):
+        regex = Concat(regex, Character("ab"[index % 2]))
+    return regex
+
+
+def main() -> None:
+    print(f"{'n':>8} {'shape':>14} {'NFA states':>11} {'time (s)':>10} {'us/node':>8}")
+    for size in SIZES:
+        for shape in (alternation, concatenation):
+            regex = shape(size)
+            start = time.perf_counter()
+            nfa = regex.thompson()
+            elapsed = time.perf_counter() - start
+            print(f"{size:>8} {shape.__name__:>14} {len(nfa.K):>11} {elapsed:>10.4f} "
+                  f"{elapsed / (2 * size - 1) * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# The specs and inputs of the regression tests, with the output of the original
+# lex (one DFA per token, every prefix tried) on each of them: the tokens, or
+# the error message, at a character or at EOF, on the first line or a later one.
+# The inputs stick to the syntax both parsers read the same way.
+
+SPECS = {
+    "keywords": [("IF", "if"), ("ID", "[a-z]+"), ("NUM", "[0-9]+"), ("SPACE", "\\ "), ("NEWLINE", "\n")],
+    "priority": [("AB", "ab"), ("A", "a"), ("ABS", "(ab)+"), ("B", "b"), ("NEWLINE", "\n")],
+    "backtracking": [("A", "a"), ("AB", "a*b"), ("SPACE", "\\ "), ("NEWLINE", "\n")],
+    "groups": [("BC", "(bc)+"), ("D", "d(a|b)*"), ("NEWLINE", "\n")],
+    "multiline": [("WORD", "(a|b|c)+"), ("LINES", "(\n)+"), ("SPACE", "\\ ")],
+    "numbers": [("INT", "[0-9]+"), ("FLOAT", "[0-9]+.[0-9]+"), ("DOT", "."),
+                ("SPACE", "\\ "), ("NEWLINE", "\n")],
+    "language": [("DEF", "def"), ("ID", "([a-z]|_)([a-z]|[0-9]|_)*"), ("INT", "[0-9]+"),
+                 ("SPACE", "\\ "), ("NEWLINE", "\n")],
+}
+
+CASES = {
+    "keywords": [
+        ('f #', [('', 'No viable alternative at character 2, line 0')]),
+        ('ii#1zz##\nf', [('', 'No viable alternative at character 2, line 0')]),
+        ('f\ni', [('ID', 'f'), ('NEWLINE', '\n'), ('ID', 'i')]),
+        ('ifi1i1#\n\n\n', [('', 'No viable alternative at character 6, line 0')]),
+        ('#f iif#z1\n1', [('', 'No viable alternative at character 0, line 0')]),
+        ('\n \nz i',
+         [('NEWLINE', '\n'), ('SPACE', ' '), ('NEWLINE', '\n'), ('ID', 'z'), ('SPACE', ' '),
+          ('ID', 'i')]),
+        ('f iz', [('ID', 'f'), ('SPACE', ' '), ('ID', 'iz')]),
+        ('11ii##i i\n', [('', 'No viable alternative at character 4, line 0')]),
+        ('i1', [('ID', 'i'), ('NUM', '1')]),
+        ('\niii\n ', [('NEWLINE', '\n'), ('ID', 'iii'), ('NEWLINE', '\n'), ('SPACE', ' ')]),
+        ('1zi1iiii', [('NUM', '1'), ('ID', 'zi'), ('NUM', '1'), ('ID', 'iiii')]),
+        ('\n11', [('NEWLINE', '\n'), ('NUM', '11')]),
+        ('i ', [('ID', 'i'), ('SPACE', ' ')]),
+        (' f\n\n#', [('', 'No viable alternative at character EOF, line 2')]),
+        ('\ni1\nz1\n1',
+         [('NEWLINE', '\n'), ('ID', 'i'), ('NUM', '1'), ('NEWLINE', '\n'), ('ID', 'z'),
+          ('NUM', '1'), ('NEWLINE', '\n'), ('NUM', '1')]),
+        ('1 i\n i\nf',
+         [('NUM', '1'), ('SPACE', ' '), ('ID', 'i'), ('NEWLINE', '\n'), ('SPACE', ' '),
+          ('ID', 'i'), ('NEWLINE', '\n'), ('ID', 'f')]),
+        ('', []),
+        (' #  1#iii ', [('', 'No viable alternative at character 1, line 0')]),
+        ('#1 f', [('', 'No viable alternative at character 0, line 0')]),
+        ('f  11', [('ID', 'f'), ('SPACE', ' '), ('SPACE', ' '), ('NUM', '11')]),
+        ('iif1z1', [('ID', 'iif'), ('NUM', '1'), ('ID', 'z'), ('NUM', '1')]),
+        (' f\n', [('SPACE', ' '), ('ID', 'f'), ('NEWLINE', '\n')]),
+    ],
+    "priority": [
+        ('aa#bba\naab', [('', 'No viable alternative at character 2, line 0')]),
+        ('a#\nbaaa#ab#', [('', 'No viable alternative at character 1, line 0')]),
+        ('bb', [('B', 'b'), ('B', 'b')]),
+        ('a#b#a\nb#b\n', [('', 'No viable alternative at character 1, line 0')]),
+        ('\nb\n#\n', [('', 'No viable alternative at character EOF, line 2')]),
+        ('', []),
+        ('aaa\n##', [('', 'No viable alternative at character 0, line 1')]),
+        ('#aa\n#b', [('', 'No viable alternative at character 0, line 0')]),
+        ('baa#baaa', [('', 'No viable alternative at character 3, line 0')]),
+        ('#a\n#aa\naa#b', [('', 'No viable alternative at character 0, line 0')]),
+        ('a##', [('', 'No viable alternative at character 1, line 0')]),
+        ('a#abab', [('', 'No viable alternative at character 1, line 0')]),
+        ('\nabaaa#a', [('', 'No viable alternative at character 5, line 1')]),
+        ('ab', [('AB', 'ab')]),
+        ('a\n', [('A', 'a'), ('NEWLINE', '\n')]),
+        ('#\nabab###\n', [('', 'No viable alternative at character 0, line 0')]),
+        ('baaaaaa',
+         [('B', 'b'), ('A', 'a'), ('A', 'a'), ('A', 'a'), ('A', 'a'), ('A', 'a'), ('A', 'a')]),
+        ('\n', [('NEWLINE', '\n')]),
+        ('a##\nbabab\n\n', [('', 'No viable alternative at character 1, line 0')]),
+        ('bbbab\naa#', [('', 'No viable alternative at character EOF, line 1')]),
+        ('\na#aab\n##\na', [('', 'No viable alternative at character 1, line 1')]),
+        ('\nab\nb\n\n\na',
+         [('NEWLINE', '\n'), ('AB', 'ab'), ('NEWLINE', '\n'), ('B', 'b'), ('NEWLINE', '\n'),
+          ('NEWLINE', '\n'), ('NEWLINE', '\n'), ('A', 'a')]),
+    ],
+    "backtracking": [
+        ('a a', [('A', 'a'), ('SPACE', ' '), ('A', 'a')]),
+        (' a#babaaaa ', [('', 'No viable alternative at character 2, line 0')]),
+        ('ab\na', [('AB', 'ab'), ('NEWLINE', '\n'), ('A', 'a')]),
+        ('\n# #b\na\na  ', [('', 'No viable alternative at character 0, line 1')]),
+        ('#', [('', 'No viable alternative at character 0, line 0')]),
+        ('\nabaa#ba ', [('', 'No viable alternative at character 4, line 1')]),
+        (' ', [('SPACE', ' ')]),
+        ('\n', [('NEWLINE', '\n')]),
+        ('a#aa##', [('', 'No viable alternative at character 1, line 0')]),
+        ('a', [('A', 'a')]),
+        ('#\na a#a', [('', 'No viable alternative at character 0, line 0')]),
+        ('', []),
+        ('  \naa \na ',
+         [('SPACE', ' '), ('SPACE', ' '), ('NEWLINE', '\n'), ('A', 'a'), ('A', 'a'),
+          ('SPACE', ' '), ('NEWLINE', '\n'), ('A', 'a'), ('SPACE', ' ')]),
+        ('a# a#aaa', [('', 'No viable alternative at character 1, line 0')]),
+        ('ab \n#baa b', [('', 'No viable alternative at character 0, line 1')]),
+        (' bab ', [('SPACE', ' '), ('AB', 'b'), ('AB', 'ab'), ('SPACE', ' ')]),
+        ('b#\n', [('', 'No viable alternative at character 1, line 0')]),
+        ('b\n', [('AB', 'b'), ('NEWLINE', '\n')]),
+        ('# \n \nba\nb', [('', 'No viable alternative at character 0, line 0')]),
+        ('aa', [('A', 'a'), ('A', 'a')]),
+        ('\nb\n b \n',
+         [('NEWLINE', '\n'), ('AB', 'b'), ('NEWLINE', '\n'), ('SPACE', ' '), ('AB', 'b'),
+          ('SPACE', ' '), ('NEWLINE', '\n')]),
+        ('a  ', [('A', 'a'), ('SPACE', ' '), ('SPACE', ' ')]),
+    ],
+    "groups": [
+        ('c#\nb#', [('', 'No viable alternative at character 1, line 0')]),
+        ('\n\n#a', [('', 'No viable alternative at character EOF, line 2')]),
+        ('#bbdcdbda', [('', 'No viable alternative at character 0, line 0')]),
+        ('ccbdcd', [('', 'No viable alternative at character 1, line 0')]),
+        ('##ca\na\n', [('', 'No viable alternative at character 0, line 0')]),
+        ('cab##\nbba', [('', 'No viable alternative at character 1, line 0')]),
+        ('b#a#\nbacc\n\n', [('', 'No viable alternative at character 1, line 0')]),
+        ('bc#dcc#dcc', [('', 'No viable alternative at character 2, line 0')]),
+        ('\n\n#bdc#bd', [('', 'No viable alternative at character 0, line 2')]),
+        ('ab', [('', 'No viable alternative at character 1, line 0')]),
+        ('#bbbd#dbdab', [('', 'No viable alternative at character 0, line 0')]),
+        ('\ndbbddaaabc', [('', 'No viable alternative at character EOF, line 1')]),
+        ('b\naacbdbdb', [('', 'No viable alternative at character 1, line 0')]),
+        ('ababdbb\nd\n', [('', 'No viable alternative at character 1, line 0')]),
+        ('#ad\n\n', [('', 'No viable alternative at character 0, line 0')]),
+        ('\n##db#d\nbb', [('', 'No viable alternative at character 0, line 1')]),
+        ('b\nabdb\nd', [('', 'No viable alternative at character 1, line 0')]),
+        ('\nb\nc\n\n\n\ncc', [('', 'No viable alternative at character 1, line 1')]),
+        ('\nabbb', [('', 'No viable alternative at character 1, line 1')]),
+        ('d\n', [('D', 'd'), ('NEWLINE', '\n')]),
+        ('\nbabd\ncaad#', [('', 'No viable alternative at character 1, line 1')]),
+        ('\nb', [('', 'No viable alternative at character EOF, line 1')]),
+    ],
+    "multiline": [
+        ('c', [('WORD', 'c')]),
+        ('\n\nb  \nac',
+         [('LINES', '\n\n'), ('WORD', 'b'), ('SPACE', ' '), ('SPACE', ' '), ('LINES', '\n'),
+          ('WORD', 'ac')]),
+        ('', []),
+        ('  \n\n\n#b', [('', 'No viable alternative at character 0, line 3')]),
+        ('#bc b', [('', 'No viable alternative at character 0, line 0')]),
+        ('bbc \n\ncc\n ',
+         [('WORD', 'bbc'), ('SPACE', ' '), ('LINES', '\n\n'), ('WORD', 'cc'), ('LINES', '\n'),
+          ('SPACE', ' ')]),
+        ('cc  \n a#', [('', 'No viable alternative at character EOF, line 1')]),
+        ('\n\n # #', [('', 'No viable alternative at character 1, line 2')]),
+        (' ab #c#  ', [('', 'No viable alternative at character 4, line 0')]),
+        (' a#b cc#', [('', 'No viable alternative at character 2, line 0')]),
+        ('a', [('WORD', 'a')]),
+        (' b#a\n', [('', 'No viable alternative at character 2, line 0')]),
+        ('\n\ncba', [('LINES', '\n\n'), ('WORD', 'cba')]),
+        ('b\n b \n #\nba', [('', 'No viable alternative at character 1, line 2')]),
+        ('b c\n##', [('', 'No viable alternative at character 0, line 1')]),
+        ('b\n # a##\n#c', [('', 'No viable alternative at character 1, line 1')]),
+        ('a \n\n#\n\n', [('', 'No viable alternative at character 0, line 2')]),
+        ('a  ', [('WORD', 'a'), ('SPACE', ' '), ('SPACE', ' ')]),
+        ('c# c ', [('', 'No viable alternative at character 1, line 0')]),
+        ('\nc', [('LINES', '\n'), ('WORD', 'c')]),
+        ('acbc##caa\n', [('', 'No viable alternative at character 4, line 0')]),
+        ('\n\naa \na',
+         [('LINES', '\n\n'), ('WORD', 'aa'), ('SPACE', ' '), ('LINES', '\n'), ('WORD', 'a')]),
+    ],
+    "numbers": [
+        ('901109', [('INT', '901109')]),
+        ('11. 0.0', [('INT', '11'), ('DOT', '.'), ('SPACE', ' '), ('FLOAT', '0.0')]),
+        ('0#\n..#9#.', [('', 'No viable alternative at character 1, line 0')]),
+        ('1 .0#.\n', [('', 'No viable alternative at character 4, line 0')]),
+        ('.00\n9', [('DOT', '.'), ('INT', '00'), ('NEWLINE', '\n'), ('INT', '9')]),
+        (' ', [('SPACE', ' ')]),
+        ('000\n001 0',
+         [('INT', '000'), ('NEWLINE', '\n'), ('INT', '001'), ('SPACE', ' '), ('INT', '0')]),
+        ('01\n .1#', [('', 'No viable alternative at character EOF, line 1')]),
+        ('.#9.\n09', [('', 'No viable alternative at character 1, line 0')]),
+        ('# \n9', [('', 'No viable alternative at character 0, line 0')]),
+        ('.', [('DOT', '.')]),
+        ('#9', [('', 'No viable alternative at character 0, line 0')]),
+        (' . \n#9', [('', 'No viable alternative at character 0, line 1')]),
+        ('#\n', [('', 'No viable alternative at character 0, line 0')]),
+        ('9# .1.#9919', [('', 'No viable alternative at character 1, line 0')]),
+        ('9..#1 \n# \n\n', [('', 'No viable alternative at character 3, line 0')]),
+        ('9011\n#', [('', 'No viable alternative at character EOF, line 1')]),
+        ('', []),
+        ('0#\n\n\n0.', [('', 'No viable alternative at character 1, line 0')]),
+        (' ##', [('', 'No viable alternative at character 1, line 0')]),
+        ('0 #099#\n\n.', [('', 'No viable alternative at character 2, line 0')]),
+        ('0019#', [('', 'No viable alternative at character 4, line 0')]),
+    ],
+    "language": [
+        ('1', [('INT', '1')]),
+        ('ze\ne__dff', [('ID', 'ze'), ('NEWLINE', '\n'), ('ID', 'e__dff')]),
+        ('de_z__## ', [('', 'No viable alternative at character 6, line 0')]),
+        ('1#_\nfede', [('', 'No viable alternative at character 1, line 0')]),
+        ('de_zee\n _', [('ID', 'de_zee'), ('NEWLINE', '\n'), ('SPACE', ' '), ('ID', '_')]),
+        ('e\n1 \nez\n _',
+         [('ID', 'e'), ('NEWLINE', '\n'), ('INT', '1'), ('SPACE', ' '), ('NEWLINE', '\n'),
+          ('ID', 'ez'), ('NEWLINE', '\n'), ('SPACE', ' '), ('ID', '_')]),
+        ('#', [('', 'No viable alternative at character 0, line 0')]),
+        ('', []),
+        ('ze11_\ne', [('ID', 'ze11_'), ('NEWLINE', '\n'), ('ID', 'e')]),
+        ('1 e#__1d', [('', 'No viable alternative at character 3, line 0')]),
+        ('_ \nez', [('ID', '_'), ('SPACE', ' '), ('NEWLINE', '\n'), ('ID', 'ez')]),
+        ('1f_', [('INT', '1'), ('ID', 'f_')]),
+        ('_\n# 1_ \n \nd', [('', 'No viable alternative at character 0, line 1')]),
+        ('dfed', [('ID', 'dfed')]),
+        ('fz##d\nd__z\n', [('', 'No viable alternative at character 2, line 0')]),
+        ('d1\n_zf', [('ID', 'd1'), ('NEWLINE', '\n'), ('ID', '_zf')]),
+        ('\n', [('NEWLINE', '\n')]),
+        (' \ne_', [('SPACE', ' '), ('NEWLINE', '\n'), ('ID', 'e_')]),
+        ('\nz', [('NEWLINE', '\n'), ('ID', 'z')]),
+        ('1f z\n\n',
+         [('INT', '1'), ('ID', 'f'), ('SPACE', ' '), ('ID', 'z'), ('NEWLINE', '\n'),
+          ('NEWLINE', '\n')]),
+        ('#_1zzd\n1', [('', 'No viable alternative at character 0, line 0')]),
+        ('z_#dd', [('', 'No viable alternative at character 2, line 0')]),
+    ],
+}
@@ -0,0 +1,31 @@
+import unittest
+
+from src.benchmarks.suite import MIN_SECONDS, compare
+
+
+def results(**metrics: float) -> dict:
+    return {"results": [{"spec": "language", "stage": "lex", "size": 1024} | metrics]}
+
+
+class TestCompare(unittest.TestCase):
+    def test_timing_noise(self) -> None:
+        # Slower by less than MIN_SECONDS: not a regression, whatever the ratio.
+        baseline = results(seconds=MIN_SECONDS / 10, mb_per_s=10.0, peak_bytes=1000)
+        new = results(seconds=MIN_SECONDS / 2, mb_per_s=2.0, peak_bytes=1000)
+        self.assertEqual(compare(new, baseline, 0.25), [])
+
+    def test_peak_bytes_under_the_noise_floor(self) -> None:
+        baseline = results(seconds=MIN_SECONDS / 10, peak_bytes=1000)
+        new = results(seconds=MIN_SECONDS / 10, peak_bytes=2000)
+        self.assertEqual(len(compare(new, baseline, 0.25)), 1)
+        self.assertIn("peak_bytes", compare(new, baseline, 0.25)[0])
+
+    def test_timings(self) -> None:
+        baseline = results(seconds=1.0, mb_per_s=10.0, peak_bytes=1000, dfa_states=5)
+        new = results(seconds=2.0, mb_per_s=5.0, peak_bytes=1000, dfa_states=6)
+        regressions = compare(new, baseline, 0.25)
+        self.assertEqual(len(regressions), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from src.Codegen import load_module, module_digest
+from src.Lexer import Lexer
+from src.tests.cases import CASES, SPECS
+from src.tests.test_lexer import LexTestCase
+
+
+class TestCodegen(LexTestCase):
+    # The generated lex must give the output of Lexer.lex.
+    def test_generated(self) -> None:
+        self.check(lambda lexer, word: load_module(lexer).lex(word))
+
+    def test_characters_past_the_rows(self) -> None:
+        lexer = Lexer(SPECS["language"])
+        module = load_module(lexer)
+        for word in ("é", "if €", "xÿ\U0001f600", "return\nĀ"):
+            with self.subTest(word=word):
+                self.assertEqual(module.lex(word), lexer.lex(word))
+
+    def test_cached(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            lexer = Lexer(SPECS["language"])
+            path = os.path.join(cache_dir, "lexer_" + module_digest(lexer) + ".py")
+            for _ in range(2):
+                # Written the first time, imported from the file the second.
+                module = load_module(lexer, cache_dir)
+                self.assertEqual(module.__file__, path)
+                for word, expected in CASES["language"]:
+                    self.assertEqual(module.lex(word), expected)
+            self.assertEqual(os.listdir(cache_dir), [os.path.basename(path)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from src.DFA import DFA
+from src.Lexer import Lexer
+from src.tests.cases import CASES, SPECS
+
+
+class TestAcceptMany(unittest.TestCase):
+    # accept_many must tell the same as accept, word by word.
+    def test_accept_many(self) -> None:
+        for name, cases in CASES.items():
+            words = [word for word, _ in cases]
+            # NULs separate the words inside accept_many, non Latin-1 text takes the other path.
+            words += ["", "a\0b", "\0", "if\0", "é€", "x" * 300]
+            for token_name, regex in SPECS[name]:
+                table = Lexer([(token_name, regex)]).table
+                with self.subTest(spec=name, token=token_name):
+                    self.assertEqual(list(table.accept_many(words)), [table.accept(word) for word in words])
+                    self.assertEqual(list(table.accept_many(words[:-2])),
+                                     [table.accept(word) for word in words[:-2]])
+
+    def test_no_words(self) -> None:
+        self.assertEqual(list(Lexer(SPECS["keywords"]).table.accept_many([])), [])
+
+
+class TestAccept(unittest.TestCase):
+    def test_changed_after_accept(self) -> None:
+        # The DFA is a mutable dataclass, accept runs on its current fields.
+        dfa = DFA(S={"a"}, K={0, 1}, q0=0, d={(0, "a"): 1}, F={1})
+        self.assertTrue(dfa.accept("a"))
+        self.assertFalse(dfa.accept(""))
+        dfa.F.add(0)
+        self.assertTrue(dfa.accept(""))
+        dfa.d[(1, "a")] = 1
+        self.assertTrue(dfa.accept("aaa"))
+        self.assertEqual(list(dfa.accept_many(["", "aa", "b"])), [True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
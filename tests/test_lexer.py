@@ -0,0 +1,315 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+from src.Lexer import Lexer, compiled_tables
+from src.TokenStream import Token
+from src.tests.cases import CASES, SPECS
+
+
+class LexTestCase(unittest.TestCase):
+    # Every way of lexing must give the output of the original lex on the cases.
+    def check(self, lex: Callable[[Lexer, str], list[tuple[str, str]]],
+              make_lexer: Callable[[list[tuple[str, str]]], Lexer] = Lexer) -> None:
+        for name, cases in CASES.items():
+            lexer = make_lexer(SPECS[name])
+            for word, expected in cases:
+                with self.subTest(spec=name, word=word):
+                    self.assertEqual(lex(lexer, word), expected)
+
+
+def as_lex(tokens: Iterable[tuple[str, str]]) -> list[tuple[str, str]]:
+    # The streaming lexers yield the tokens found before an error, lex only the error.
+    tokens = list(tokens)
+    return tokens[-1:] if tokens and tokens[-1][0] == "" else tokens
+
+
+class TestLex(LexTestCase):
+    def test_lex(self) -> None:
+        self.check(Lexer.lex)
+
+    def test_empty_input(self) -> None:
+        self.assertEqual(Lexer(SPECS["keywords"]).lex(""), [])
+
+    def test_lexer_reused(self) -> None:
+        # The lexer keeps no state from one input to the next.
+        lexer = Lexer(SPECS["language"])
+        for _ in range(2):
+            for word, expected in CASES["language"]:
+                self.assertEqual(lexer.lex(word), expected)
+
+    def test_linear(self) -> None:
+        self.check(lambda lexer, word: lexer.lex(word, linear=True))
+
+    def test_compiled_tables(self) -> None:
+        # Lexers of the same spec and options share one table, lazy ones grow their own.
+        spec = SPECS["language"]
+        table = Lexer(spec).table
+        self.assertIs(Lexer([list(token) for token in spec]).table, table)
+        self.assertIsNot(Lexer(spec, minimize=False).table, table)
+        self.assertIsNot(Lexer(spec, lazy=True).table, Lexer(spec, lazy=True).table)
+        compiled_tables.clear()
+        self.assertIsNot(Lexer(spec).table, table)
+
+
+class TestLazy(LexTestCase):
+    def test_lazy(self) -> None:
+        self.check(Lexer.lex, lambda spec: Lexer(spec, lazy=True))
+
+    def test_small_memory_budget(self) -> None:
+        # The states are dropped and built again all the time.
+        self.check(Lexer.lex, lambda spec: Lexer(spec, lazy=True, memory_budget=1000))
+        self.check(lambda lexer, word: lexer.lex(word, linear=True),
+                   lambda spec: Lexer(spec, lazy=True, memory_budget=1000))
+
+
+class TestUtf8(LexTestCase):
+    # A UTF-8 lexer runs on bytes, on ASCII inputs it lexes like the others.
+    def test_utf8(self) -> None:
+        self.check(Lexer.lex, lambda spec: Lexer(spec, utf8=True))
+        self.check(lambda lexer, word: lexer.lex(word, linear=True), lambda spec: Lexer(spec, utf8=True))
+
+    def test_lazy(self) -> None:
+        self.check(Lexer.lex, lambda spec: Lexer(spec, utf8=True, lazy=True))
+
+    def test_bytes(self) -> None:
+        self.check(lambda lexer, word: lexer.tokenize(memoryview(word.encode())).to_list(),
+                   lambda spec: Lexer(spec, utf8=True))
+
+    def test_multibyte(self) -> None:
+        lexer = Lexer([("WORD", "(é|a|€)+"), ("SPACE", "\\ ")], utf8=True)
+        self.assertEqual(lexer.lex("aé €a"), [("WORD", "aé"), ("SPACE", " "), ("WORD", "€a")])
+        self.assertEqual(lexer.tokenize("é a".encode()).to_list(), [("WORD", "é"), ("SPACE", " "), ("WORD", "a")])
+
+
+class TestStream(LexTestCase):
+    def test_lex_stream(self) -> None:
+        for chunk_size in (1, 3, 1 << 16):
+            self.check(lambda lexer, word: as_lex(lexer.lex_stream(io.StringIO(word), chunk_size)))
+
+    def test_tokens_before_error(self) -> None:
+        lexer = Lexer(SPECS["keywords"])
+        self.assertEqual(list(lexer.lex_stream(io.StringIO("if 12\n#"), 2)),
+                         [("IF", "if"), ("SPACE", " "), ("NUM", "12"), ("NEWLINE", "\n"),
+                          ("", "No viable alternative at character EOF, line 1")])
+
+    def test_read_after_error(self) -> None:
+        # Only the input needed to place the error is read, not the rest of the file.
+        lexer = Lexer(SPECS["keywords"])
+        fp = io.StringIO("if #" + "if " * 100000)
+        self.assertEqual(list(lexer.lex_stream(fp, 16))[-1], ("", "No viable alternative at character 3, line 0"))
+        self.assertLessEqual(fp.tell(), 32)
+
+    def test_alex(self) -> None:
+        for chunk_size in (1, 3, 1 << 16):
+            self.check(lambda lexer, word: as_lex((token.name, token.lexeme)
+                                                  for token in alex(lexer, word, chunk_size)))
+
+    def test_alex_positions(self) -> None:
+        for name, cases in CASES.items():
+            lexer = Lexer(SPECS[name])
+            for word, _ in cases:
+                tokens = lexer.tokenize(word.encode("latin-1"))
+                if tokens.error is not None:
+                    continue
+                with self.subTest(spec=name, word=word):
+                    self.assertEqual([(token.line, token.column) for token in alex(lexer, word, 2)],
+                                     [tokens.position(index) for index in range(len(tokens))])
+
+    def test_alex_error_without_eof(self) -> None:
+        # The error comes as soon as enough input is read to place it, the
+        # connection being left open.
+        lexer = Lexer(SPECS["keywords"])
+        word = "if # if if if\n"
+        for chunk_size in (1, 3, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual([(token.name, token.lexeme) for token in alex(lexer, word, chunk_size, False)],
+                                 [("IF", "if"), ("SPACE", " "), ("", lexer.lex(word)[0][1])])
+
+
+def alex(lexer: Lexer, word: str, chunk_size: int, eof: bool = True) -> list[Token]:
+    async def collect() -> list[Token]:
+        reader = asyncio.StreamReader()
+        reader.feed_data(word.encode("latin-1"))
+        if eof:
+            reader.feed_eof()
+        return [token async for token in lexer.alex(reader, chunk_size)]
+
+    # Without EOF a reader waiting for more data would block for good.
+    return asyncio.run(asyncio.wait_for(collect(), 10))
+
+
+class TestFile(LexTestCase):
+    def test_lex_file(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.txt")
+
+            def lex_file(lexer: Lexer, word: str) -> list[tuple[str, str]]:
+                with open(path, "wb") as file:
+                    file.write(word.encode("latin-1"))
+                with lexer.lex_file(path) as tokens:
+                    return tokens.to_list()
+
+            self.check(lex_file)
+
+    def test_bytes(self) -> None:
+        self.check(lambda lexer, word: lexer.tokenize(word.encode("latin-1")).to_list())
+
+    def test_from_spec(self) -> None:
+        # The first lexer is compiled and written to the cache, the second is read from it.
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                self.check(Lexer.lex, lambda spec: Lexer.from_spec(spec, cache_dir))
+            self.assertEqual(len(os.listdir(cache_dir)), len(SPECS))
+
+
+class TestTokenStream(LexTestCase):
+    def test_tokenize(self) -> None:
+        self.check(lambda lexer, word: lexer.tokenize(word).to_list())
+
+    def test_lazy_tokens(self) -> None:
+        # Materialized one by one, by slices or by name, the tokens are the ones of lex.
+        def tokens_of(lexer: Lexer, word: str) -> list[tuple[str, str]]:
+            tokens = lexer.tokenize(word)
+            if tokens.error is not None:
+                return tokens.error
+            self.assertEqual([tokens[index] for index in range(len(tokens))], list(tokens))
+            self.assertEqual(list(tokens[1:]), list(tokens)[1:])
+            name = lexer.spec[0][0]
+            self.assertEqual(list(tokens.keep([name])), [token for token in tokens if token[0] == name])
+            self.assertEqual(list(tokens.drop([name])), [token for token in tokens if token[0] != name])
+            return list(tokens)
+
+        self.check(tokens_of)
+
+
+class TestRelex(LexTestCase):
+    def test_relex(self) -> None:
+        # Every case is reached by an edit inserting or deleting one character.
+        def relex(lexer: Lexer, word: str) -> list[tuple[str, str]]:
+            for offset in range(len(word) + 1):
+                for old_word, deleted, inserted in ((word[:offset] + word[offset + 1:], 0, word[offset:offset + 1]),
+                                                    (word[:offset] + "a" + word[offset:], 1, "")):
+                    tokens = lexer.tokenize(old_word, lines=True, incremental=True)
+                    if offset % 2:
+                        # The newline index is built, relex updates it.
+                        tokens.line_index
+                    tokens, _ = lexer.relex(tokens, offset, deleted, inserted, word)
+                    expected = lexer.tokenize(word, lines=True)
+                    self.assertEqual(tokens.to_list(), expected.to_list())
+                    self.assertEqual(list(tokens.starts), list(expected.starts))
+                    self.assertEqual(list(tokens.lines), list(expected.lines))
+            return tokens.to_list()
+
+        self.check(relex)
+
+    def test_edits(self) -> None:
+        # The stream is edited again and again in place.
+        lexer = Lexer(SPECS["language"])
+        words = [word for word, _ in CASES["language"]]
+        word = "".join(words)
+        tokens = lexer.tokenize(word, lines=True, incremental=True)
+        tokens.line_index
+        for index, inserted in enumerate(words):
+            offset = index * 7 % (len(word) + 1)
+            deleted = min(index % 3, len(word) - offset)
+            word = word[:offset] + inserted + word[offset + deleted:]
+            tokens, (first, old_end, new_end) = lexer.relex(tokens, offset, deleted, inserted, word)
+            expected = lexer.tokenize(word, lines=True)
+            self.assertEqual(tokens.to_list(), expected.to_list())
+            self.assertEqual(list(tokens.lines), list(expected.lines))
+            self.assertEqual(list(tokens.line_index.offsets),
+                             [offset for offset, char in enumerate(word) if char == "\n"])
+            self.assertLessEqual(first, new_end)
+
+
+class TestParallel(LexTestCase):
+    def parallel_lexer(self, spec: list[tuple[str, str]], lazy: bool = False) -> Lexer:
+        # Every input is split, the chunks get next to no overlap: tokens and
+        # errors cross chunk bounds and are lexed again sequentially.
+        lexer = Lexer(spec, lazy=lazy)
+        lexer.min_parallel_chunk = 1
+        lexer.chunk_overlap = 1
+        return lexer
+
+    def test_lex_parallel(self) -> None:
+        self.check(lambda lexer, word: lexer.lex_parallel(word, workers=3), self.parallel_lexer)
+
+    def test_lines(self) -> None:
+        lexer = self.parallel_lexer(SPECS["multiline"])
+        for word, _ in CASES["multiline"]:
+            with self.subTest(word=word):
+                expected = lexer.tokenize(word, lines=True)
+                tokens = lexer.tokenize_parallel(word, workers=4, lines=True)
+                self.assertEqual(tokens.to_list(), expected.to_list())
+                self.assertEqual(list(tokens.lines), list(expected.lines))
+
+    def test_lazy(self) -> None:
+        # Lexed sequentially, a lazy lexer cannot be sent to the workers.
+        self.check(lambda lexer, word: lexer.lex_parallel(word, workers=3),
+                   lambda spec: self.parallel_lexer(spec, lazy=True))
+
+
+class TestMany(LexTestCase):
+    def check_many(self, make_lexer: Callable[[list[tuple[str, str]]], Lexer],
+                   executor: Executor | None = None) -> None:
+        for name, cases in CASES.items():
+            lexer = make_lexer(SPECS[name])
+            words = [word for word, _ in cases]
+            with self.subTest(spec=name):
+                self.assertEqual(list(lexer.lex_many(words, executor, batch_size=4)),
+                                 [expected for _, expected in cases])
+                results = dict(lexer.lex_many(words, executor, ordered=False, batch_size=4))
+                self.assertEqual([results[index] for index in range(len(cases))],
+                                 [expected for _, expected in cases])
+
+    def test_sequential(self) -> None:
+        self.check_many(Lexer)
+
+    def test_threads(self) -> None:
+        with ThreadPoolExecutor(8) as executor:
+            self.check_many(Lexer, executor)
+            # The threads lex with their own copies of a lazy lexer.
+            self.check_many(lambda spec: Lexer(spec, lazy=True, memory_budget=1000), executor)
+
+    def test_processes(self) -> None:
+        with ProcessPoolExecutor(2) as executor:
+            self.check_many(Lexer, executor)
+            self.check_many(lambda spec: Lexer(spec, lazy=True), executor)
+
+    def test_process_pool(self) -> None:
+        # The workers get the lexer when they start, the batches only hold the words.
+        for name, cases in CASES.items():
+            lexer = Lexer(SPECS[name])
+            with lexer.process_pool(2) as executor:
+                with self.subTest(spec=name):
+                    self.assertEqual(list(lexer.lex_many([word for word, _ in cases], executor, batch_size=4)),
+                                     [expected for _, expected in cases])
+
+    def test_pickled_once(self) -> None:
+        lexer = Lexer(SPECS["language"])
+        self.assertIs(lexer.__reduce__(), lexer.__reduce__())
+
+    def test_loaded_once(self) -> None:
+        # A process builds a lexer it receives the first time only.
+        for lexer in (Lexer(SPECS["language"]), Lexer(SPECS["language"], lazy=True)):
+            data = pickle.dumps(lexer)
+            self.assertIs(pickle.loads(data), pickle.loads(data))
+
+    def test_cached_lexer_pickled_as_path(self) -> None:
+        # A lexer of the cache is sent as its file, not as its table.
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                lexer = Lexer.from_spec(SPECS["keywords"], cache_dir)
+                data = pickle.dumps(lexer)
+                self.assertLess(len(data), 1000)
+                self.assertEqual(pickle.loads(data).lex("if 12"), lexer.lex("if 12"))
+
+
+if __name__ == "__main__":
+    unittest.main()
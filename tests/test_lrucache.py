@@ -0,0 +1,41 @@
+import unittest
+
+from src.LRUCache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self) -> None:
+        # The least recently used key goes first, a get counts as a use.
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_resize(self) -> None:
+        cache = LRUCache(4)
+        for key in "abcd":
+            cache.put(key, key.upper())
+        cache.resize(2)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual([cache.get(key) for key in "abcd"], [None, None, "C", "D"])
+
+        # A size of 0 disables the cache.
+        cache.resize(0)
+        cache.put("e", "E")
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get("e"))
+
+    def test_clear(self) -> None:
+        cache = LRUCache()
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
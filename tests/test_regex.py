@@ -0,0 +1,105 @@
+import pickle
+import unittest
+
+from src.Regex import Character, Concat, Repeat, RegexSyntaxError, Star, parse_regex, parsed_regexes
+
+
+class TestThompson(unittest.TestCase):
+    def test_negated_class(self) -> None:
+        # Without an alphabet, [^a] is one class and not every other character.
+        for regex, accepted, rejected in (("[^a]", ["b", "é", "\U0010ffff"], ["a", "", "bb"]),
+                                          ("([^a-c]|a)+d", ["ad", "zzad", "€d"], ["bd", "d", "ab"]),
+                                          ("[^a]*", ["", "bcd", "\n"], ["bad", "a"])):
+            dfa = parse_regex(regex).thompson().subset_construction()
+            self.assertLess(len(dfa.K), 10)
+            for word in accepted:
+                with self.subTest(regex=regex, word=word):
+                    self.assertTrue(dfa.accept(word))
+                    self.assertTrue(dfa.minimize().accept(word))
+            for word in rejected:
+                with self.subTest(regex=regex, word=word):
+                    self.assertFalse(dfa.accept(word))
+                    self.assertFalse(dfa.minimize().accept(word))
+
+
+class TestParser(unittest.TestCase):
+    def check(self, regex: str, accepted: list[str], rejected: list[str]) -> None:
+        dfa = parse_regex(regex).thompson().subset_construction()
+        for word in accepted:
+            with self.subTest(regex=regex, word=word):
+                self.assertTrue(dfa.accept(word))
+        for word in rejected:
+            with self.subTest(regex=regex, word=word):
+                self.assertFalse(dfa.accept(word))
+
+    def test_repetitions(self) -> None:
+        self.check("a{3}", ["aaa"], ["", "aa", "aaaa"])
+        self.check("a{2,}", ["aa", "aaaaa"], ["", "a"])
+        self.check("a{,2}", ["", "a", "aa"], ["aaa"])
+        self.check("(ab){1,2}c", ["abc", "ababc"], ["c", "abababc", "abac"])
+        self.check("a{0}b", ["b"], ["ab"])
+
+    def test_classes(self) -> None:
+        self.check("[b-d]", ["b", "c", "d"], ["a", "e", "-", ""])
+        self.check("[a-cx]+", ["ax", "cbx"], ["d", "-"])
+        # A '-' first or last in a class is a character.
+        self.check("[-a]", ["-", "a"], ["b"])
+        self.check("[a-c-]", ["-", "b"], ["d"])
+        self.check("[0-9a-]*", ["1-a", ""], ["b"])
+
+    def test_brace_not_a_repetition(self) -> None:
+        self.check("a{", ["a{"], ["a"])
+        self.check("a{x}", ["a{x}"], ["a"])
+        self.check("{,}", ["{,}"], [""])
+        self.check("a{1,2", ["a{1,2"], ["a"])
+
+    def test_deep_nesting(self) -> None:
+        # Groups are not parsed recursively, the depth is not bounded.
+        for depth in (250, 5000):
+            self.check("(" * depth + "a" + ")" * depth, ["a"], ["", "aa"])
+
+    def test_errors(self) -> None:
+        for regex, message, position in (("a(bc", "missing ')'", 1),
+                                         ("((a)", "missing ')'", 0),
+                                         ("a)", "unbalanced ')'", 1),
+                                         ("[ab", "missing ']'", 0),
+                                         ("x[c-a]", "empty range c-a", 3),
+                                         ("ab{3,2}", "repetition bounds 3 > 2", 2),
+                                         ("a|", "empty regex or alternative", 2),
+                                         ("*a", "nothing to repeat before '*'", 0)):
+            with self.subTest(regex=regex):
+                with self.assertRaises(RegexSyntaxError) as context:
+                    parse_regex(regex)
+                self.assertEqual(context.exception.position, position)
+                self.assertEqual(str(context.exception), f"{message} at position {position} of {regex!r}")
+
+
+class TestHashConsing(unittest.TestCase):
+    def test_equal_nodes(self) -> None:
+        a, b = Character("a"), Character("b")
+        self.assertIs(Character("a"), a)
+        self.assertIs(Concat(a, Star(b)), Concat(Character("a"), Star(Character("b"))))
+        self.assertIsNot(Concat(a, b), Concat(b, a))
+
+    def test_keyword_arguments(self) -> None:
+        # However the arguments are passed, defaults included, the node is the same.
+        a = Character("a")
+        self.assertIs(Concat(regex1=a, regex2=a), Concat(a, a))
+        self.assertIs(Repeat(a, 2, maximum=3), Repeat(a, 2, 3))
+        self.assertIs(Repeat(a, 2), Repeat(a, 2, None))
+        self.assertIs(Repeat(regex=a, minimum=2), Repeat(a, 2))
+        with self.assertRaises(TypeError):
+            Repeat(a, minimum=2, other=3)
+
+    def test_parsed(self) -> None:
+        # Equal regexes share their nodes, cached or not, pickled or not.
+        regex = parse_regex("(ab)*c{2,}")
+        self.assertIs(parse_regex("(ab)*c{2,}"), regex)
+        self.assertIs(parse_regex("(ab)* c{2,}"), regex)
+        self.assertIs(pickle.loads(pickle.dumps(regex)), regex)
+        parsed_regexes.clear()
+        self.assertIs(parse_regex("(ab)*c{2,}"), regex)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import io
+import unittest
+
+from src.Lexer import Lexer
+from src.Stats import CompileStats, LexStats
+from src.tests.cases import SPECS
+
+
+def counters(stats: LexStats) -> tuple:
+    # Everything but the time.
+    return (stats.size, stats.tokens, stats.transitions, stats.rescanned, stats.failed,
+            stats.token_counts, stats.token_sizes, stats.longest)
+
+
+class TestLexStats(unittest.TestCase):
+    def test_tokens(self) -> None:
+        stats = Lexer(SPECS["keywords"], stats=True).tokenize("if iff 12\nif").stats
+        self.assertEqual(stats.token_counts, {"IF": 2, "SPACE": 2, "ID": 1, "NUM": 1, "NEWLINE": 1})
+        self.assertEqual(stats.token_sizes, {"IF": 4, "SPACE": 2, "ID": 3, "NUM": 2, "NEWLINE": 1})
+        self.assertEqual((stats.size, stats.tokens, stats.failed), (12, 7, False))
+        self.assertEqual(stats.longest[0], (3, 3, "ID"))
+
+    def test_rescanned(self) -> None:
+        # a*b reads the whole run of a's for every a token.
+        stats = Lexer(SPECS["backtracking"], stats=True).tokenize("aaaa").stats
+        self.assertEqual(stats.token_counts, {"A": 4})
+        self.assertGreater(stats.rescanned, 0)
+        self.assertEqual(stats.transitions, stats.rescanned + 4)
+
+    def test_failed(self) -> None:
+        lexer = Lexer(SPECS["keywords"], stats=True)
+        self.assertIsNotNone(lexer.tokenize("if #").error)
+        self.assertTrue(lexer.lex_stats.failed)
+
+    def test_on_stats(self) -> None:
+        # Once for building the lexer, then once per run.
+        reports = []
+        lexer = Lexer(SPECS["keywords"], on_stats=reports.append)
+        self.assertEqual([type(report) for report in reports], [CompileStats])
+        self.assertEqual(set(reports[0].token_sizes), {name for name, _ in SPECS["keywords"]})
+        for word in ("if 1", "12", "if #"):
+            lexer.tokenize(word)
+        self.assertEqual([type(report) for report in reports], [CompileStats] + [LexStats] * 3)
+        self.assertIs(reports[-1], lexer.lex_stats)
+
+    def test_lazy(self) -> None:
+        lexer = Lexer(SPECS["language"], lazy=True, stats=True)
+        first = lexer.tokenize("def f_1 12\n").stats
+        self.assertGreater(first.states_built, 0)
+        # The states are built already.
+        self.assertEqual(lexer.tokenize("def f_1 12\n").stats.states_built, 0)
+
+        lexer = Lexer(SPECS["language"], lazy=True, memory_budget=1000, stats=True)
+        self.assertGreater(lexer.tokenize("def f_1 12 abc_9 x\n" * 50).stats.flushes, 0)
+
+    def test_streams(self) -> None:
+        # lex_stream and alex count what tokenize counts.
+        lexer = Lexer(SPECS["backtracking"], stats=True)
+        for word in ("aab a\naaab", "a b #"):
+            with self.subTest(word=word):
+                expected = counters(lexer.tokenize(word).stats)
+                list(lexer.lex_stream(io.StringIO(word), 2))
+                self.assertEqual(counters(lexer.lex_stats), expected)
+
+                async def alex() -> None:
+                    reader = asyncio.StreamReader()
+                    reader.feed_data(word.encode())
+                    reader.feed_eof()
+                    async for _ in lexer.alex(reader, 2):
+                        pass
+
+                asyncio.run(alex())
+                self.assertEqual(counters(lexer.lex_stats), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()